@@ -4,38 +4,150 @@
 
 
 # %%
-from collections import deque
-from collections.abc import Callable
-from datetime import date
+import ast
+import atexit
+import gc
+import hashlib
+import heapq
+import importlib
+import json
+import mmap
+import multiprocessing.connection
+import os
+import pickle
+import platform
+import queue
+import re
+import sys
+import tempfile
+import threading
+import tracemalloc
+import weakref
+from array import array
+from collections import OrderedDict, deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
 from fractions import Fraction
-from functools import cache, lru_cache, reduce
-from io import StringIO
+from functools import partial, wraps
+from inspect import getsource, signature, unwrap
 from itertools import (
     accumulate,
     combinations,
-    combinations_with_replacement,
+    count,
     islice,
     permutations,
     product,
+    repeat,
 )
-from math import ceil, comb, factorial, gcd, isqrt, lcm, log10, prod, sqrt
-from time import perf_counter
+from math import ceil, comb, factorial, gcd, isqrt, lcm, log, log10, prod, sqrt
+from multiprocessing import shared_memory
+from pathlib import Path
+from time import perf_counter, sleep, time
+from types import CodeType, FunctionType
+from typing import IO
 
 import numpy as np
-import pandas as pd
-import pyperclip
-import snoop
-from icecream import ic
-from IPython.display import Latex, Markdown, display
-from more_itertools import sieve
-from sympy import isprime, prevprime
+
+# Input files and the cache live next to this file, whatever the working
+# directory (the current one when there is no file, as in a bare REPL).
+DATA_DIR = Path(__file__).resolve().parent if "__file__" in globals() else Path.cwd()
+CACHE_DIR = Path(os.environ.get("EULER_CACHE_DIR", DATA_DIR / ".euler_cache"))
+
+# Heavy or interactive-only dependencies, bound below to stand-ins that import
+# them on first use (or imported inside the functions that use them) so that
+# importing this file only pays for numpy.
+_LAZY_IMPORTS = {
+    "snoop": ("snoop", None),
+    "ic": ("icecream", "ic"),
+    "Latex": ("IPython.display", "Latex"),
+    "Markdown": ("IPython.display", "Markdown"),
+    "display": ("IPython.display", "display"),
+}
+
+
+def _snoop_fallback(func=None, *args, **kwargs):
+    return func if callable(func) else lambda func: func
+
+
+def _ic_fallback(*args):
+    print(*args)
+    return args[0] if len(args) == 1 else args or None
+
+
+# Debug-only tools degrade to no-ops when they are not installed.
+_OPTIONAL_FALLBACKS = {"snoop": _snoop_fallback, "ic": _ic_fallback}
+
+
+class _LazyImport:
+    """
+    Stand-in for a name in ``_LAZY_IMPORTS`` that imports the real object on
+    first call or attribute access and then replaces itself in the module
+    globals.
+
+    Tools that inspect their caller see the stand-in on that first call, so the
+    first ``ic(x)`` is labelled ``ic| *args: ...`` instead of ``ic| x: ...``.
+    Call ``load_lazy_imports()``, or set ``EULER_DEBUG_TOOLS=1``, to bind the
+    real objects before debugging.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.value = None
+
+    def resolve(self):
+        if self.value is None:
+            module_name, attribute = _LAZY_IMPORTS[self.name]
+            try:
+                module = importlib.import_module(module_name)
+            except ImportError:
+                if self.name not in _OPTIONAL_FALLBACKS:
+                    raise
+                self.value = _OPTIONAL_FALLBACKS[self.name]
+            else:
+                self.value = module if attribute is None else getattr(module, attribute)
+            globals()[self.name] = self.value
+        return self.value
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, attribute: str):
+        return getattr(self.resolve(), attribute)
+
+    def __repr__(self) -> str:
+        return f"<lazy import of {self.name!r}>"
+
+
+snoop = _LazyImport("snoop")
+ic = _LazyImport("ic")
+Latex = _LazyImport("Latex")
+Markdown = _LazyImport("Markdown")
+display = _LazyImport("display")
+
+
+def load_lazy_imports() -> None:
+    """Bind the real object of every lazy name that can be imported, now."""
+    for name in _LAZY_IMPORTS:
+        if isinstance(stand_in := globals()[name], _LazyImport):
+            try:
+                stand_in.resolve()
+            except ImportError:
+                pass  # stays lazy, and raises when it is actually used
+
+
+if os.environ.get("EULER_DEBUG_TOOLS", "0") != "0":
+    load_lazy_imports()
 
 
 def print_and_copy_answer(func: Callable):
+    """Report every answer ``func`` returns to the active answer sinks."""
+
+    @wraps(func)
     def wrapper(*args, **kwargs):
         result = func(*args, **kwargs)
-        print(result)
-        pyperclip.copy(str(result))
+        for sink in _answer_sinks:
+            sink(func.__name__, result)
         return result
 
     return wrapper
@@ -53,14 +165,19 @@ def time_function(func: Callable):
     return wrapper
 
 
-def open_input(filename: str) -> str:
+def open_input(filename: str | os.PathLike, encoding: str = "utf-8") -> str:
     """
     Opens and reads the contents of a file.
 
+    Meant for small files; see the Input section for streaming, memory-mapped
+    and cached alternatives.
+
     Parameters
     ----------
-    filename : str
+    filename : str | os.PathLike
         The name of the file to be opened.
+    encoding : str, optional
+        by default "utf-8"
     Returns
     -------
     str
@@ -74,11 +191,1506 @@ def open_input(filename: str) -> str:
     IOError
         For other I/O related errors.
     """
+    with open(filename, encoding=encoding) as file:
+        return file.read()
+
+
+def cold_start_import_times(
+    budget_ms: float | None = 400.0, source: str | os.PathLike = __file__
+) -> dict[str, float]:
+    """
+    Time importing ``source`` in a fresh interpreter with ``python -X importtime``.
+
+    The module is imported from its own directory, so the total includes
+    everything it does at import time (tables, registration, ...) as well as the
+    modules it imports.
+
+    Parameters
+    ----------
+    budget_ms : float | None, optional
+        cold-start budget for the whole import, by default 400.0; None only
+        reports
+    source : str | os.PathLike, optional
+        the file to check, by default this file
+
+    Returns
+    -------
+    dict[str, float]
+        cumulative milliseconds of every module ``source`` imports directly, the
+        module's own top-level work under its name and the whole import under
+        ``"total"``; modules already loaded at interpreter start-up do not
+        appear
+
+    Raises
+    ------
+    RuntimeError
+        If the import takes longer than ``budget_ms``.
+    """
+    import subprocess
+
+    source = Path(source).resolve()
+    run = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"__import__({source.stem!r})"],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=source.parent,
+    )
+    times: dict[str, float] = {}
+    children: dict[str, float] = {}
+    for line in run.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package", nested
+        # imports are indented under, and printed before, the package that
+        # pulled them in.
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line.removeprefix("import time:").split("|")
+        own = int(own) / 1000
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 1:
+            children[name.strip()] = int(cumulative) / 1000
+        elif depth == 0:
+            if name.strip() == source.stem:
+                times = children | {source.stem: own, "total": int(cumulative) / 1000}
+            children = {}
+    if budget_ms is not None and times["total"] > budget_ms:
+        slowest = sorted(
+            (module for module in times if module != "total"),
+            key=times.get,
+            reverse=True,
+        )[:3]
+        raise RuntimeError(
+            f"importing {source.name} takes {times['total']:.0f} ms, over the "
+            f"{budget_ms:.0f} ms budget (slowest: "
+            f"{', '.join(f'{m} {times[m]:.0f} ms' for m in slowest)})"
+        )
+    return times
+
+
+# %% [markdown]
+# ## Answer Sinks
+#
+# Every answer returned through `print_and_copy_answer` is handed to the active
+# sinks. `EULER_ANSWER_SINKS` picks them at start-up as a comma-separated list of
+# `stdout`, `clipboard` and `jsonl:<path>` (empty for none; default
+# `stdout,clipboard`), and `answer_sinks(...)` swaps them for a block. With no
+# sinks, a decorated solver costs nothing beyond the solver itself.
+
+
+# %%
+def stdout_sink(name: str, result) -> None:
+    print(result)
+
+
+class CollectorSink:
+    """Keep every ``(solver name, answer)`` pair in memory, in call order."""
+
+    def __init__(self):
+        self.results: list[tuple[str, object]] = []
+
+    def __call__(self, name: str, result) -> None:
+        self.results.append((name, result))
+
+
+class JsonlSink:
+    """Append each answer to ``path`` as a ``solver``/``answer``/``time`` JSON line."""
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = Path(path)
+
+    def __call__(self, name: str, result) -> None:
+        # Answers that JSON cannot hold (numpy integers, Fractions) are written
+        # as their str().
+        record = {"solver": name, "answer": result, "time": time()}
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(record, default=str) + "\n")
+
+
+class ClipboardSink:
+    """
+    Copy answers to the clipboard from a background thread.
+
+    Solvers never wait on xclip/xsel: answers are queued and a daemon thread
+    copies only the newest one. Clipboard failures, as on headless machines,
+    and a missing pyperclip are ignored. Pending copies are flushed at exit.
+    """
+
+    def __init__(self):
+        self._queue: queue.Queue[str] = queue.Queue()
+        self._thread: threading.Thread | None = None
+
+    def __call__(self, name: str, result) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+        self._queue.put(str(result))
+
+    def _run(self) -> None:
+        try:
+            import pyperclip
+        except ImportError:
+            pyperclip = None
+        while True:
+            texts = [self._queue.get()]
+            while not self._queue.empty():
+                texts.append(self._queue.get())
+            if pyperclip is not None:
+                try:
+                    pyperclip.copy(texts[-1])
+                except pyperclip.PyperclipException:
+                    pass
+            for _ in texts:
+                self._queue.task_done()
+
+    def flush(self, timeout: float = 1.0) -> None:
+        """Wait up to ``timeout`` seconds for queued answers to be copied."""
+        deadline = perf_counter() + timeout
+        while self._queue.unfinished_tasks and perf_counter() < deadline:
+            sleep(0.005)
+
+
+def parse_answer_sinks(spec: str) -> tuple[Callable, ...]:
+    """
+    Sinks named by a ``stdout,clipboard,jsonl:<path>`` specification.
+
+    Raises
+    ------
+    ValueError
+        If a sink name is not recognised.
+    """
+    sinks = []
+    for name in filter(None, (part.strip() for part in spec.split(","))):
+        if name == "stdout":
+            sinks.append(stdout_sink)
+        elif name == "clipboard":
+            sinks.append(ClipboardSink())
+        elif name.startswith("jsonl:"):
+            sinks.append(JsonlSink(name.removeprefix("jsonl:")))
+        else:
+            raise ValueError(f"unknown answer sink {name!r}")
+    return tuple(sinks)
+
+
+_answer_sinks = parse_answer_sinks(
+    os.environ.get("EULER_ANSWER_SINKS", "stdout,clipboard")
+)
+
+
+@contextmanager
+def answer_sinks(*sinks: Callable) -> Iterator[tuple[Callable, ...]]:
+    """
+    Send answers only to ``sinks`` inside the block; no arguments silences them.
+
+    >>> with answer_sinks(collector := CollectorSink()):
+    ...     multiples_of_3_or_5(10)
+    """
+    global _answer_sinks
+    previous, _answer_sinks = _answer_sinks, sinks
     try:
-        with open(filename, encoding="utf-8") as file:
-            return file.read()
-    except (FileNotFoundError, PermissionError, IOError) as e:
-        raise e
+        yield sinks
+    finally:
+        _answer_sinks = previous
+
+
+# %% [markdown]
+# ## Problem Registry
+#
+# Each problem's cell registers its canonical solver, arguments and expected
+# answer instead of calling the solver, so importing this file solves nothing.
+# `solve(n)` runs one problem in place; the runner at the end of the file runs
+# any subset in parallel.
+
+
+# %%
+def _argument_repr(value) -> str:
+    if isinstance(value, Path) and value.parent == DATA_DIR:
+        return f"DATA_DIR / {value.name!r}"
+    return repr(value)
+
+
+class Problem:
+    """A registered problem: ``solver(*args, **kwargs)`` should equal ``expected``."""
+
+    def __init__(
+        self, number: int, solver: Callable, args: tuple, kwargs: dict, expected
+    ):
+        self.number = number
+        self.solver = solver
+        self.args = args
+        self.kwargs = kwargs
+        self.expected = expected
+
+    def __repr__(self) -> str:
+        arguments = [
+            *map(_argument_repr, self.args),
+            *(f"{k}={_argument_repr(v)}" for k, v in self.kwargs.items()),
+        ]
+        return f"{self.solver.__name__}({', '.join(arguments)})"
+
+    def solve(self):
+        return self.solver(*self.args, **self.kwargs)
+
+
+PROBLEMS: dict[int, Problem] = {}
+
+
+def register(number: int, solver: Callable, *args, expected=None, **kwargs) -> Problem:
+    """
+    Record ``solver(*args, **kwargs)`` as the solution of problem ``number``.
+
+    Raises
+    ------
+    ValueError
+        If the problem is already registered.
+    """
+    if number in PROBLEMS:
+        raise ValueError(
+            f"problem {number} is already registered as {PROBLEMS[number]}"
+        )
+    PROBLEMS[number] = Problem(number, solver, args, kwargs, expected)
+    return PROBLEMS[number]
+
+
+def solve(number: int):
+    """Answer of problem ``number``, reported to the answer sinks like any solver."""
+    return PROBLEMS[number].solve()
+
+
+# %% [markdown]
+# ## Input
+#
+# Ways to read puzzle inputs without paying for a whole-file read and decode up
+# front: text or byte chunks, delimiter-separated records streamed across chunk
+# boundaries, a zero-copy memory map, and a cache of parsed forms keyed by the
+# file's content hash and the parser's source.
+
+
+# %%
+def iter_chunks(
+    filename: str | os.PathLike,
+    chunk_size: int = 1 << 16,
+    encoding: str | None = "utf-8",
+) -> Iterator[str] | Iterator[bytes]:
+    """
+    Stream a file ``chunk_size`` characters at a time.
+
+    Decoding is incremental, so multi-byte characters are never split. With
+    ``encoding=None`` the file is read as ``bytes`` instead.
+    """
+    mode = "rb" if encoding is None else "r"
+    with open(filename, mode, encoding=encoding) as file:
+        yield from iter(lambda: file.read(chunk_size), file.read(0))
+
+
+def iter_records(
+    filename: str | os.PathLike,
+    delimiter: str = "\n",
+    strip_chars: str = "",
+    chunk_size: int = 1 << 16,
+    encoding: str = "utf-8",
+) -> Iterator[str]:
+    """
+    Stream the ``delimiter``-separated records of a text file.
+
+    Records may straddle chunk boundaries; only the unfinished tail of the
+    current chunk is carried over. Each record is stripped of ``strip_chars``,
+    and an empty last record (a file ending in ``delimiter``) is dropped.
+    """
+    tail = ""
+    for chunk in iter_chunks(filename, chunk_size, encoding):
+        *records, tail = (tail + chunk).split(delimiter)
+        for record in records:
+            yield record.strip(strip_chars)
+    if tail := tail.strip(strip_chars):
+        yield tail
+
+
+def mmap_input(filename: str | os.PathLike) -> memoryview:
+    """
+    Zero-copy read-only view of a file's bytes.
+
+    The view keeps the mapping alive and it is unmapped once the view is freed.
+    Pages are faulted in as they are touched, so slicing or
+    ``np.frombuffer``-ing the view reads only what is used.
+    """
+    with open(filename, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return memoryview(b"")
+        return memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def file_digest(filename: str | os.PathLike) -> str:
+    """
+    SHA-1 hex digest of a file's contents.
+
+    Digests are remembered under ``CACHE_DIR`` by path, size and modification
+    time, so an unchanged file is not read again to hash it.
+    """
+    stat = os.stat(filename)
+    key = f"{os.path.abspath(filename)}:{stat.st_size}:{stat.st_mtime_ns}"
+    memo = CACHE_DIR / "digests" / hashlib.sha1(key.encode()).hexdigest()
+    if memo.exists():
+        return memo.read_text()
+    digest = hashlib.sha1(mmap_input(filename)).hexdigest()
+    memo.parent.mkdir(parents=True, exist_ok=True)
+    memo.write_text(digest)
+    return digest
+
+
+def cached_parse(filename: str | os.PathLike, parser: Callable, cache: bool = True):
+    """
+    ``parser(filename)``, cached under ``CACHE_DIR`` by the file's content hash.
+
+    The cache key also holds the parser's qualified name, so different parsers
+    of one file do not collide, and its source version (as for
+    ``persistent_cache``, covering the helpers it calls), so editing the parser
+    invalidates what it parsed before. Parsed forms are pickled; on a hit, for
+    an unchanged file and parser, the file is not read.
+    """
+    if not cache:
+        return parser(filename)
+    name = f"{parser.__module__}.{parser.__qualname__}"
+    digest = file_digest(filename)
+    version = _source_version(parser)[:16]
+    path = CACHE_DIR / "parsed" / f"{name}_{version}_{digest}.pkl"
+    if path.exists():
+        with open(path, "rb") as file:
+            return pickle.load(file)
+    parsed = parser(filename)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for stale in path.parent.glob(f"{name}_*_{digest}.pkl"):
+        stale.unlink(missing_ok=True)  # what older versions of the parser made
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as file:
+        pickle.dump(parsed, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return parsed
+
+
+# %% [markdown]
+# ## Result Cache
+#
+# `@persistent_cache` keeps a solver's results in an SQLite file under
+# `CACHE_DIR`, keyed by the solver's qualified name, a hash of its source and
+# its pickled arguments. The hash also covers every function and class of this
+# module the solver refers to, followed transitively, and the constants they
+# use, so editing the solver or any helper it reaches invalidates its old
+# results. The file is kept under `max_bytes` by evicting the least recently
+# used results. Set `EULER_RESULT_CACHE=0`, use `result_cache_disabled()` or run
+# the problems with `--fresh` to always recompute.
+
+
+# %%
+class ResultCache:
+    """
+    SQLite store of pickled results, bounded by least-recent use.
+
+    Each process opens its own connection on first use, so forked workers can
+    share the file; writes are serialised by SQLite.
+    """
+
+    def __init__(self, path: str | os.PathLike, max_bytes: int = 64 << 20):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._connection = None
+        self._pid = None
+
+    def _connect(self):
+        if self._pid != os.getpid():
+            import sqlite3
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=30)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY,"
+                " function TEXT NOT NULL, version TEXT NOT NULL, value BLOB NOT NULL,"
+                " size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)"
+            )
+            self._pid = os.getpid()
+        return self._connection
+
+    def get(self, key: str) -> tuple[bool, object]:
+        """``(True, value)`` for a stored key, else ``(False, None)``."""
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT value FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return False, None
+            connection.execute(
+                "UPDATE results SET accessed = ? WHERE key = ?", (time(), key)
+            )
+        return True, pickle.loads(row[0])
+
+    def put(self, key: str, function: str, version: str, value) -> None:
+        """Store ``value``, then evict the least recently used over ``max_bytes``."""
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (key, function, version, blob, len(blob), time()),
+            )
+            (total,) = connection.execute("SELECT SUM(size) FROM results").fetchone()
+            stale = []
+            for old_key, size in connection.execute(
+                "SELECT key, size FROM results ORDER BY accessed"
+            ):
+                if total <= self.max_bytes:
+                    break
+                stale.append((old_key,))
+                total -= size
+            connection.executemany("DELETE FROM results WHERE key = ?", stale)
+        self.evictions += len(stale)
+
+    def invalidate(self, function: str, version: str) -> None:
+        """Drop the results of other versions of ``function``."""
+        with self._connect() as connection:
+            connection.execute(
+                "DELETE FROM results WHERE function = ? AND version != ?",
+                (function, version),
+            )
+
+    def clear(self, function: str | None = None) -> None:
+        """Drop every result, or only those of ``function``."""
+        with self._connect() as connection:
+            if function is None:
+                connection.execute("DELETE FROM results")
+            else:
+                connection.execute(
+                    "DELETE FROM results WHERE function = ?", (function,)
+                )
+
+    def stats(self) -> dict[str, int]:
+        """Stored ``entries``, their total ``bytes`` and ``evictions`` so far."""
+        with self._connect() as connection:
+            entries, size = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+        return {"entries": entries, "bytes": size, "evictions": self.evictions}
+
+
+result_cache = ResultCache(CACHE_DIR / "results.sqlite")
+_result_cache_enabled = os.environ.get("EULER_RESULT_CACHE", "1") != "0"
+
+
+@contextmanager
+def result_cache_disabled() -> Iterator[None]:
+    """Recompute every ``@persistent_cache`` call inside the block."""
+    global _result_cache_enabled
+    previous, _result_cache_enabled = _result_cache_enabled, False
+    try:
+        yield
+    finally:
+        _result_cache_enabled = previous
+
+
+# Module-level constants whose values are hashed along with the code using them.
+_VERSIONED_CONSTANTS = (int, float, str, bytes, tuple, frozenset)
+
+
+def _code_names(code: CodeType) -> Iterator[str]:
+    """Global and attribute names used by ``code`` and the code nested in it."""
+    yield from code.co_names
+    for constant in code.co_consts:
+        if isinstance(constant, CodeType):
+            yield from _code_names(constant)
+
+
+def _source_version(func: Callable) -> str:
+    """
+    Hash of ``func``'s source and that of every function and class of its module
+    that it refers to, directly or through one another, along with the values of
+    the simple constants they use.
+    """
+    namespace = func.__globals__
+    sources: dict[str, str] = {}
+    pending = [func]
+    while pending:
+        obj = unwrap(pending.pop())
+        name = f"{obj.__module__}.{obj.__qualname__}"
+        if name in sources:
+            continue
+        if isinstance(obj, type):
+            methods = (
+                getattr(value, "__func__", value) for value in vars(obj).values()
+            )
+            codes = [
+                method.__code__
+                for method in methods
+                if isinstance(method, FunctionType)
+            ]
+        else:
+            codes = [obj.__code__]
+        try:
+            sources[name] = getsource(obj)
+        except (OSError, TypeError):
+            # No source file (e.g. exec'd code): fall back to the bytecode.
+            sources[name] = repr(
+                [(code.co_code, code.co_consts, code.co_names) for code in codes]
+            )
+        for code in codes:
+            for global_name in _code_names(code):
+                value = namespace.get(global_name)
+                if isinstance(value, _VERSIONED_CONSTANTS):
+                    sources[f"{func.__module__}.{global_name}"] = repr(value)
+                    continue
+                if not isinstance(value, (type, FunctionType)):
+                    value = type(value)  # e.g. prime_sieve -> PrimeSieve
+                if value.__module__ == func.__module__:
+                    pending.append(value)
+    digest = hashlib.sha1()
+    for name in sorted(sources):
+        digest.update(f"{name}\n{sources[name]}\n".encode())
+    return digest.hexdigest()
+
+
+def persistent_cache(func: Callable | None = None, *, store: ResultCache | None = None):
+    """
+    Memoize ``func`` on disk in ``store`` (by default ``result_cache``).
+
+    Calls whose arguments cannot be pickled are not cached. The wrapper's
+    ``cache_info()`` reports this process's hits and misses along with the
+    store's statistics, and ``cache_clear()`` drops the function's results.
+    """
+    if func is None:
+        return partial(persistent_cache, store=store)
+    store = result_cache if store is None else store
+    name = f"{func.__module__}.{func.__qualname__}"
+    version = None
+    counters = {"hits": 0, "misses": 0}
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        nonlocal version
+        if not _result_cache_enabled:
+            return func(*args, **kwargs)
+        try:
+            arguments = pickle.dumps((args, sorted(kwargs.items())))
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return func(*args, **kwargs)
+        if version is None:
+            # Hashed on first use, not at import, to keep start-up cheap.
+            version = _source_version(func)
+            store.invalidate(name, version)
+        key = hashlib.sha1(f"{name}:{version}:".encode() + arguments).hexdigest()
+        found, value = store.get(key)
+        if found:
+            counters["hits"] += 1
+            return value
+        counters["misses"] += 1
+        value = func(*args, **kwargs)
+        store.put(key, name, version, value)
+        return value
+
+    wrapper.cache_info = lambda: counters | store.stats()
+    wrapper.cache_clear = lambda: store.clear(name)
+    return wrapper
+
+
+# %% [markdown]
+# ## Memoization
+#
+# `@memoize` is a bounded stand-in for `functools.cache`: the least recently used
+# results are evicted past `max_entries` or `max_bytes`, and results for small
+# non-negative integer arguments can live in a compact `array` instead of a
+# dict. Every memoized function is listed in a registry, so `memo_info()` and
+# `clear_memos()` can inspect and free all of them between batch jobs.
+
+
+# %%
+_memo_registry: weakref.WeakValueDictionary[str, Callable] = (
+    weakref.WeakValueDictionary()
+)
+_KWARGS_MARK = object()
+
+
+def _approximate_size(obj) -> int:
+    """``sys.getsizeof`` of ``obj`` plus that of its items, one level deep."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (tuple, list, set, frozenset)):
+        size += sum(map(sys.getsizeof, obj))
+    elif isinstance(obj, dict):
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in obj.items())
+    return size
+
+
+def memoize(
+    func: Callable | None = None,
+    *,
+    max_entries: int | None = None,
+    max_bytes: int | None = None,
+    dense: int = 0,
+    typecode: str = "q",
+):
+    """
+    Memoize ``func`` with bounded, observable storage.
+
+    Parameters
+    ----------
+    func : Callable | None
+        the function; omit it to configure the decorator, as in
+        ``@memoize(max_entries=1024)``
+    max_entries : int | None, optional
+        evict the least recently used results beyond this many, by default None
+    max_bytes : int | None, optional
+        evict the least recently used results beyond about this many bytes of
+        keys and results, not counting the dense slots; by default None
+    dense : int, optional
+        results of a single int argument in ``[0, dense)`` are kept in an
+        ``array`` of this many slots, never evicted; by default 0 (none)
+    typecode : str, optional
+        ``array`` typecode of the dense slots, by default "q" (int64); results
+        that do not fit are kept with the others
+
+    Returns
+    -------
+    Callable
+        the wrapper, with ``cache_info()`` (``hits``, ``misses``,
+        ``evictions``, ``entries`` and ``bytes``) and ``cache_clear()``
+    """
+    if func is None:
+        return partial(
+            memoize,
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            dense=dense,
+            typecode=typecode,
+        )
+    results: OrderedDict = OrderedDict()
+    sizes: dict = {}  # only tracked under max_bytes
+    bounded = max_entries is not None or max_bytes is not None
+    table = filled = result_type = None
+    hits = misses = evictions = dense_entries = result_bytes = table_bytes = 0
+
+    @wraps(func)
+    def sparse_wrapper(*args, **kwargs):
+        nonlocal hits, misses
+        key = args if not kwargs else (*args, _KWARGS_MARK, *kwargs.items())
+        try:
+            value = results[key]
+        except KeyError:
+            misses += 1
+            return store(key, func(*args, **kwargs))
+        hits += 1
+        if bounded:
+            results.move_to_end(key)
+        return value
+
+    @wraps(func)
+    def dense_wrapper(*args, **kwargs):
+        nonlocal hits, misses
+        if len(args) == 1 and not kwargs:
+            n = args[0]
+            if type(n) is int and 0 <= n < dense:
+                if filled is not None and filled[n]:
+                    hits += 1
+                    value = table[n]
+                    return value if result_type is int else result_type(value)
+                if args not in results:
+                    misses += 1
+                    return store_dense(n, func(n))
+        return sparse_wrapper(*args, **kwargs)
+
+    def store_dense(n: int, value):
+        nonlocal table, filled, result_type, dense_entries, table_bytes
+        if table is None:
+            table = array(typecode, [0]) * dense
+            filled = bytearray(dense)
+            result_type = type(value)
+            table_bytes = table.itemsize * dense + dense
+        if type(value) is not result_type:
+            return store((n,), value)
+        try:
+            table[n] = value
+        except (OverflowError, TypeError):
+            return store((n,), value)
+        filled[n] = 1
+        dense_entries += 1
+        return value
+
+    def store(key, value):
+        nonlocal evictions, result_bytes
+        results[key] = value
+        if max_bytes is not None:
+            result_bytes -= sizes.get(key, 0)
+            sizes[key] = _approximate_size(key) + _approximate_size(value)
+            result_bytes += sizes[key]
+        while bounded and (
+            (max_entries is not None and len(results) > max_entries)
+            or (max_bytes is not None and result_bytes > max_bytes)
+        ):
+            old, _ = results.popitem(last=False)
+            if max_bytes is not None:
+                result_bytes -= sizes.pop(old)
+            evictions += 1
+        return value
+
+    def cache_info() -> dict[str, int]:
+        if max_bytes is None:  # sized on demand rather than on every miss
+            size = sum(
+                _approximate_size(k) + _approximate_size(v) for k, v in results.items()
+            )
+        else:
+            size = result_bytes
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": evictions,
+            "entries": len(results) + dense_entries,
+            "bytes": size + table_bytes,
+        }
+
+    def cache_clear() -> None:
+        nonlocal table, filled, result_type
+        nonlocal hits, misses, evictions, dense_entries, result_bytes, table_bytes
+        results.clear()
+        sizes.clear()
+        table = filled = result_type = None
+        hits = misses = evictions = dense_entries = result_bytes = table_bytes = 0
+
+    wrapper = dense_wrapper if dense else sparse_wrapper
+    wrapper.cache_info = cache_info
+    wrapper.cache_clear = cache_clear
+    _memo_registry[f"{func.__module__}.{func.__qualname__}"] = wrapper
+    return wrapper
+
+
+def memo_info() -> dict[str, dict[str, int]]:
+    """``cache_info()`` of every live memoized function, by qualified name."""
+    return {name: wrapper.cache_info() for name, wrapper in _memo_registry.items()}
+
+
+def clear_memos() -> None:
+    """Empty every live memoized function's cache."""
+    for wrapper in list(_memo_registry.values()):
+        wrapper.cache_clear()
+
+
+# %% [markdown]
+# ## Prime Sieve
+#
+# Shared prime engine used by every prime-related problem below. It is a
+# segmented sieve of Eratosthenes that only stores odd numbers, so streaming
+# through the primes below $10^9$ only ever holds one segment in memory.
+# Membership tests are answered from a lookup table that is extended on demand,
+# up to `max_table`.
+
+
+# %%
+def _odd_primes_upto(n: int) -> np.ndarray:
+    """Odd primes <= n, from a plain (non-segmented) odd-only sieve."""
+    if n < 3:
+        return np.empty(0, dtype=np.int64)
+    flags = np.ones((n + 1) // 2, dtype=bool)  # flags[i] represents 2i + 1
+    flags[0] = False
+    for i in range(1, (isqrt(n) - 1) // 2 + 1):
+        if flags[i]:
+            p = 2 * i + 1
+            flags[p * p // 2 :: p] = False
+    return 2 * np.flatnonzero(flags).astype(np.int64) + 1
+
+
+class PrimeSieve:
+    """
+    Segmented, odd-only sieve of Eratosthenes.
+
+    Parameters
+    ----------
+    segment_size : int, optional
+        Number of odd values sieved per segment, by default 2**18 (a segment
+        fits comfortably in L2 cache).
+    max_table : int, optional
+        Largest value the membership table is allowed to grow to, by default
+        2**25. Beyond it, ``is_prime`` uses Miller–Rabin/BPSW instead.
+    """
+
+    def __init__(self, segment_size: int = 1 << 18, max_table: int = 1 << 25):
+        self.segment_size = segment_size
+        self.max_table = max_table
+        self._base = _odd_primes_upto(1 << 10)
+        self._base_limit = 1 << 10
+        self._table = np.empty(0, dtype=bool)  # _table[i] represents 2i + 1
+        self._table_limit = 0  # _table covers the odd numbers below this
+
+    def _base_primes(self, n: int) -> np.ndarray:
+        """Odd primes <= n, growing the cached base primes when needed."""
+        if n > self._base_limit:
+            self._base_limit = max(n, 2 * self._base_limit)
+            self._base = _odd_primes_upto(self._base_limit)
+        return self._base[: np.searchsorted(self._base, n, side="right")]
+
+    def _sieve_odd(self, low: int, count: int) -> np.ndarray:
+        """Primality flags of the ``count`` odd numbers starting at odd ``low``."""
+        high = low + 2 * count
+        if high <= self._table_limit:
+            return self._table[low // 2 : high // 2]
+
+        flags = np.ones(count, dtype=bool)
+        primes = self._base_primes(isqrt(high - 1))
+        starts = np.maximum(primes * primes, -(-low // primes) * primes)
+        starts += primes * (starts % 2 == 0)  # first odd multiple
+        for p, offset in zip(primes.tolist(), ((starts - low) // 2).tolist()):
+            flags[offset::p] = False
+        if low == 1:
+            flags[0] = False
+        return flags
+
+    def _extend_table(self, n: int) -> None:
+        """Grow the lookup table so that it covers ``n``."""
+        new_limit = max(n + 1, 2 * self._table_limit, 1 << 16)
+        new_limit += new_limit % 2
+        low = self._table_limit + 1
+        extension = [
+            self._sieve_odd(start, min(self.segment_size, (new_limit - start + 1) // 2))
+            for start in range(low, new_limit, 2 * self.segment_size)
+        ]
+        self._table = np.concatenate([self._table, *extension])
+        self._table_limit = new_limit
+
+    def segments(self, start: int = 2, stop: int | None = None) -> Iterator[np.ndarray]:
+        """
+        Yield the primes in ``[start, stop)`` one segment at a time.
+
+        Each segment is an ``int64`` array; memory use is bounded by
+        ``segment_size`` however large ``stop`` is. With ``stop=None`` the
+        stream is unbounded.
+        """
+        if start <= 2 and (stop is None or stop > 2):
+            yield np.array([2], dtype=np.int64)
+        low = max(start, 3) | 1
+        while stop is None or low < stop:
+            count = self.segment_size
+            if stop is not None:
+                count = min(count, (stop - low + 1) // 2)
+            flags = self._sieve_odd(low, count)
+            yield low + 2 * np.flatnonzero(flags).astype(np.int64)
+            low += 2 * count
+
+    def primes(self, start: int = 2, stop: int | None = None) -> Iterator[int]:
+        """Yield the primes in ``[start, stop)`` as Python ints."""
+        for segment in self.segments(start, stop):
+            yield from segment.tolist()
+
+    def is_prime(self, n: int) -> bool:
+        if n < 3:
+            return n == 2
+        if n % 2 == 0:
+            return False
+        if n >= self._table_limit and n < self.max_table:
+            self._extend_table(n)
+        if n < self._table_limit:
+            return bool(self._table[n // 2])
+        return _is_prime_large(n)
+
+    def lookup(self, values: np.ndarray) -> np.ndarray:
+        """Vectorized table lookup for an array of values below ``max_table``."""
+        values = np.asarray(values, dtype=np.int64)
+        if len(values) and values.max() >= self._table_limit:
+            self._extend_table(int(values.max()))
+        odd = (values % 2 == 1) & (values > 1)
+        return self._table[np.where(odd, values // 2, 0)] & odd | (values == 2)
+
+    def count(self, stop: int) -> int:
+        """Number of primes below ``stop``."""
+        return sum(len(segment) for segment in self.segments(2, stop))
+
+    def sum_primes(self, stop: int) -> int:
+        """Sum of the primes below ``stop``."""
+        return sum(int(segment.sum()) for segment in self.segments(2, stop))
+
+
+prime_sieve = PrimeSieve()
+
+
+# %%
+_BITMAP_MAGIC = b"PRMBITS\0"
+_BITMAP_HEADER = len(_BITMAP_MAGIC) + 8
+
+
+class PrimeBitmap:
+    """
+    Read-only, memory-mapped prime table with one bit per odd number.
+
+    The file is a 16 byte header (magic and limit) followed by the packed
+    primality bits of the odd numbers below ``limit``, least significant bit
+    first. Lookups read straight from the mapping, so every process that opens
+    the same file shares its pages through the OS page cache, and pickling a
+    bitmap only sends its path.
+
+    Parameters
+    ----------
+    path : str | Path
+        A table previously written by ``PrimeBitmap.build``.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as file:
+            self._mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[: len(_BITMAP_MAGIC)] != _BITMAP_MAGIC:
+            raise ValueError(f"{self.path} is not a prime bitmap")
+        self.limit = int.from_bytes(
+            self._mm[len(_BITMAP_MAGIC) : _BITMAP_HEADER], "little"
+        )
+        self._bits = np.frombuffer(self._mm, dtype=np.uint8, offset=_BITMAP_HEADER)
+
+    def __reduce__(self):
+        return PrimeBitmap, (self.path,)
+
+    @classmethod
+    def build(cls, path: str | Path, limit: int) -> "PrimeBitmap":
+        """Sieve the odd numbers below ``limit`` into a new table at ``path``."""
+        assert prime_sieve.segment_size % 8 == 0, "Segments must pack into bytes"
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        limit += limit % 2
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as file:
+            file.write(_BITMAP_MAGIC + limit.to_bytes(8, "little"))
+            for low in range(1, limit, 2 * prime_sieve.segment_size):
+                count = min(prime_sieve.segment_size, (limit - low + 1) // 2)
+                flags = prime_sieve._sieve_odd(low, count)
+                file.write(np.packbits(flags, bitorder="little").tobytes())
+        os.replace(tmp, path)  # atomic, so concurrent builders never see a partial file
+        return cls(path)
+
+    def __contains__(self, n: int) -> bool:
+        if n < 3:
+            return n == 2
+        if n % 2 == 0:
+            return False
+        if n >= self.limit:
+            return prime_sieve.is_prime(n)
+        i = n // 2
+        return bool(self._mm[_BITMAP_HEADER + (i >> 3)] >> (i & 7) & 1)
+
+    def lookup(self, values: np.ndarray) -> np.ndarray:
+        """Vectorized membership test for an array of values below ``limit``."""
+        values = np.asarray(values, dtype=np.int64)
+        i = values // 2
+        odd = (values % 2 == 1) & (values > 1)
+        bits = self._bits[np.where(odd, i, 0) >> 3] >> (i & 7).astype(np.uint8) & 1
+        return (bits.astype(bool) & odd) | (values == 2)
+
+    def primes(self, chunk_bytes: int = 1 << 16) -> Iterator[int]:
+        """Yield every prime below ``limit``, unpacking one chunk at a time."""
+        if self.limit > 2:
+            yield 2
+        for start in range(0, len(self._bits), chunk_bytes):
+            flags = np.unpackbits(
+                self._bits[start : start + chunk_bytes], bitorder="little"
+            )
+            yield from (2 * (8 * start + np.flatnonzero(flags)) + 1).tolist()
+
+
+def open_prime_table(limit: int, path: str | Path | None = None) -> PrimeBitmap:
+    """
+    Open the persistent prime table covering ``limit``, building it first if
+    it does not exist yet.
+    """
+    path = Path(path) if path is not None else CACHE_DIR / f"primes_{limit}.bits"
+    if path.exists():
+        table = PrimeBitmap(path)
+        if table.limit >= limit:
+            return table
+    return PrimeBitmap.build(path, limit)
+
+
+# %% [markdown]
+# ## Primality
+#
+# Values below `prime_sieve.max_table` are answered by the sieve's lookup
+# table. Above it, Miller–Rabin with the first thirteen prime bases (2 to 41)
+# is deterministic for every $n < 3.3 \times 10^{24}$ (which covers all 64-bit
+# inputs; twelve bases only reach $3.2 \times 10^{23}$), and larger values fall
+# through to the Baillie–PSW test, for which no counterexample is known.
+
+
+# %%
+_MR_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+_MR_DETERMINISTIC_LIMIT = 3_317_044_064_679_887_385_961_981
+
+
+def miller_rabin(n: int, bases: Iterable[int] = _MR_BASES) -> bool:
+    """Strong probable-prime test of odd ``n > 2`` to each of ``bases``."""
+    s = ((n - 1) & (1 - n)).bit_length() - 1
+    d = (n - 1) >> s
+    for a in bases:
+        a %= n
+        if a == 0:
+            continue
+        x = pow(a, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def jacobi(a: int, n: int) -> int:
+    """Jacobi symbol (a/n) for odd positive ``n``."""
+    a %= n
+    result = 1
+    while a:
+        while a % 2 == 0:
+            a //= 2
+            if n % 8 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a % 4 == 3 and n % 4 == 3:
+            result = -result
+        a %= n
+    return result if n == 1 else 0
+
+
+def strong_lucas(n: int) -> bool:
+    """Strong Lucas probable-prime test with Selfridge's parameters."""
+    if isqrt(n) ** 2 == n:
+        return False
+    D = 5
+    while (j := jacobi(D, n)) != -1:
+        if j == 0 and abs(D) != n:
+            return False
+        D = -D - 2 if D > 0 else -D + 2
+    Q = (1 - D) // 4  # P = 1
+
+    s = ((n + 1) & -(n + 1)).bit_length() - 1
+    d = (n + 1) >> s
+    U, V, Qk = 1, 1, Q % n
+    for bit in bin(d)[3:]:
+        U, V, Qk = U * V % n, (V * V - 2 * Qk) % n, Qk * Qk % n
+        if bit == "1":
+            U, V = (U + V) % n, (D * U + V) % n
+            U = (U + n if U % 2 else U) // 2
+            V = (V + n if V % 2 else V) // 2
+            Qk = Qk * Q % n
+    if U == 0 or V == 0:
+        return True
+    for _ in range(s - 1):
+        V, Qk = (V * V - 2 * Qk) % n, Qk * Qk % n
+        if V == 0:
+            return True
+    return False
+
+
+@memoize(max_entries=1 << 12)
+def _is_prime_large(n: int) -> bool:
+    """Primality of an odd ``n`` beyond the reach of the sieve table."""
+    if any(n % p == 0 for p in _MR_BASES):
+        return n in _MR_BASES
+    if n < _MR_DETERMINISTIC_LIMIT:
+        return miller_rabin(n)
+    return miller_rabin(n, (2,)) and strong_lucas(n)
+
+
+def is_prime_many(values: Iterable[int]) -> np.ndarray:
+    """
+    Batched primality test.
+
+    Values below ``prime_sieve.max_table`` are looked up in one vectorized
+    gather; the rest go through Miller–Rabin/BPSW one at a time.
+    """
+    values = np.asarray(values)
+    result = np.zeros(values.shape, dtype=bool)
+    if values.dtype == object:
+        small = np.zeros(values.shape, dtype=bool)
+    else:
+        small = values < prime_sieve.max_table
+    if small.any():
+        result[small] = prime_sieve.lookup(values[small])
+    result[~small] = [prime_sieve.is_prime(int(n)) for n in values[~small]]
+    return result
+
+
+# %% [markdown]
+# ## Prime Counting
+#
+# $\pi(x)$ and the sum of the primes up to $x$ via Lucy_Hedgehog's dynamic
+# program over the $O(\sqrt{x})$ distinct values of $\lfloor x/i \rfloor$, which
+# runs in $O(x^{3/4})$ and is vectorized with NumPy, one sieving prime at a time.
+# The $n$th prime is then located by counting up to an estimate of $p_n$ and
+# sieving only the window between the estimate and the answer.
+
+
+# %%
+def _lucy_hedgehog(x: int, tables: list[tuple[np.ndarray, np.ndarray]], weighted: bool):
+    """
+    Run Lucy_Hedgehog's sieve in place on each ``(small, large)`` table pair.
+
+    ``small[v]`` and ``large[i]`` start as F(v) and F(x // i), where F sums
+    f(k) over every integer 2 <= k <= n, with f(k) = k if ``weighted`` else 1.
+    Sieving leaves the same sums taken over the primes only. The index
+    arithmetic is shared between tables, which may have any dtype, including
+    wrapping ``uint64``.
+    """
+    r = isqrt(x)
+    quotients = np.zeros(r + 1, dtype=np.int64)
+    quotients[1:] = x // np.arange(1, r + 1)
+    for p in prime_sieve.primes(2, r + 1):
+        p2 = p * p
+        top = min(r, x // p2)
+        split = min(top, r // p)  # large[i * p] is in range while i <= split
+        outer = quotients[split + 1 : top + 1] // p
+        for small, large in tables:
+            sp = small[p - 1]
+            weight = p if weighted else 1
+            large[1 : split + 1] -= weight * (large[p : split * p + 1 : p] - sp)
+            large[split + 1 : top + 1] -= weight * (small[outer] - sp)
+            if p2 <= r:
+                # small[v // p] for v in [p2, r] is each of small[p : r // p + 1]
+                # repeated p times
+                inner = np.repeat(small[p : r // p + 1], p)[: r - p2 + 1]
+                small[p2:] -= weight * (inner - sp)
+
+
+def _lucy_values(x: int) -> tuple[np.ndarray, np.ndarray]:
+    """The values v and x // i that Lucy_Hedgehog's tables are indexed by."""
+    index = np.arange(isqrt(x) + 1, dtype=np.int64)
+    quotients = np.zeros_like(index)
+    quotients[1:] = x // index[1:]
+    return index, quotients
+
+
+def prime_pi(x: int) -> int:
+    """Number of primes <= x."""
+    if x < 2:
+        return 0
+    small, large = _lucy_values(x)
+    small, large = np.maximum(small - 1, 0), np.maximum(large - 1, 0)
+    _lucy_hedgehog(x, [(small, large)], weighted=False)
+    return int(large[1])
+
+
+def prime_sum(x: int) -> int:
+    """
+    Sum of the primes <= x.
+
+    The sum outgrows int64 around x = 3e10, so the sieve runs on two tables: one
+    in wrapping ``uint64`` arithmetic, which is exact modulo 2**64, and one in
+    ``float64``, which is off by far less than 2**63. Together they pin down the
+    exact sum without falling back to object arrays.
+    """
+    if x < 2:
+        return 0
+    values = _lucy_values(x)
+
+    def triangular(v: np.ndarray, dtype: type) -> np.ndarray:
+        if dtype is np.uint64:
+            v = v.astype(np.uint64)
+            halved = np.where(v % 2 == 0, (v // 2) * (v + 1), v * ((v + 1) // 2))
+            return halved - np.uint64(1)
+        v = v.astype(np.float64)
+        return v * (v + 1) / 2 - 1
+
+    exact_small, exact_large = (triangular(v, np.uint64) for v in values)
+    approx_small, approx_large = (triangular(v, np.float64) for v in values)
+    exact_small[:2] = approx_small[:2] = 0
+    _lucy_hedgehog(
+        x, [(exact_small, exact_large), (approx_small, approx_large)], weighted=True
+    )
+
+    residue = int(exact_large[1])
+    return residue + round((float(approx_large[1]) - residue) / 2**64) * 2**64
+
+
+def nth_prime_bounds(n: int) -> tuple[int, int]:
+    """
+    Rosser–Schoenfeld bounds ``lower < p_n < upper``, valid for n >= 6:
+
+    .. math:: n(\\ln n + \\ln\\ln n - 1) < p_n < n(\\ln n + \\ln\\ln n)
+    """
+    log_n, log_log_n = log(n), log(log(n))
+    return int(n * (log_n + log_log_n - 1)), ceil(n * (log_n + log_log_n))
+
+
+def nth_prime(n: int, sieve_threshold: int = 10**6) -> int:
+    """
+    The nth prime, counting 2 as the first.
+
+    Up to ``sieve_threshold`` a single sieve is sized by the Rosser–Schoenfeld
+    upper bound. Beyond it, ``prime_pi`` counts the primes up to an estimate of
+    p_n and only the window between the estimate and p_n is sieved. Raises
+    ``ValueError`` for ``n < 1``.
+    """
+    if n < 1:
+        raise ValueError(f"There is no prime number {n}; counting starts at 1")
+    if n < 6:
+        return (2, 3, 5, 7, 11)[n - 1]
+    lower, upper = nth_prime_bounds(n)
+    if n <= sieve_threshold:
+        primes = np.concatenate(list(prime_sieve.segments(2, upper)))
+        return int(primes[n - 1])
+
+    log_n, log_log_n = log(n), log(log(n))
+    estimate = n * (log_n + log_log_n - 1 + (log_log_n - 2) / log_n)
+    x = min(max(int(estimate), lower), upper)
+    count = prime_pi(x)
+
+    if count < n:
+        for segment in prime_sieve.segments(x + 1, upper):
+            if count + len(segment) >= n:
+                return int(segment[n - count - 1])
+            count += len(segment)
+
+    window = 2 * prime_sieve.segment_size
+    while True:
+        low = max(x - window, lower)
+        primes = np.concatenate(list(prime_sieve.segments(low + 1, x + 1)))
+        if count - len(primes) < n:
+            return int(primes[n - (count - len(primes)) - 1])
+        count, x = count - len(primes), low
+
+
+# %% [markdown]
+# ## Factorization
+#
+# Trial division by the small primes strips the easy factors, then Pollard's
+# rho with Brent's cycle detection splits whatever composite is left. Brent
+# batches the differences into a single product so that only one `gcd` is taken
+# every `batch` steps, and a failed run restarts with a new polynomial
+# $x^2 + c$. Factors up to roughly 12 digits come out in well under a second,
+# whatever the size of the number.
+
+
+# %%
+_TRIAL_PRIMES = tuple(prime_sieve.primes(2, 1 << 10))
+
+
+def pollard_brent(
+    n: int, g: Callable[[int], int], x0: int = 2, batch: int = 128
+) -> int | None:
+    """
+    Brent's variant of Pollard's rho with the iteration function ``g``.
+
+    Returns a nontrivial factor of the composite ``n``, or None when this
+    polynomial fails and the caller should retry with another one.
+    """
+    y, r, q, d = x0, 1, 1, 1
+    while d == 1:
+        x = y
+        for _ in range(r):
+            y = g(y)
+        k = 0
+        while k < r and d == 1:
+            ys = y
+            for _ in range(min(batch, r - k)):
+                y = g(y)
+                q = q * abs(x - y) % n
+            d = gcd(q, n)
+            k += batch
+        r *= 2
+    if d == n:  # the batch overshot: replay it one step at a time
+        d = 1
+        while d == 1:
+            ys = g(ys)
+            d = gcd(abs(x - ys), n)
+    return None if d == n else d
+
+
+def rho_factor(n: int, g: Callable[[int], int] | None = None) -> int:
+    """
+    A nontrivial factor of ``n``, or ``n`` itself when it is prime.
+
+    Tries ``g`` first when given, then x^2 + c for c = 1, 2, ... until one of
+    them splits ``n``.
+    """
+    if n < 4 or prime_sieve.is_prime(n):
+        return n
+    if n % 2 == 0:
+        return 2
+    if g is not None and (d := pollard_brent(n, g)) is not None:
+        return d
+    for c in count(1):
+        if (d := pollard_brent(n, lambda x: (x * x + c) % n)) is not None:
+            return d
+
+
+def factorize(n: int) -> dict[int, int]:
+    """Prime factorization of ``n`` as an ordered ``{prime: exponent}`` dict."""
+    if n < 1:
+        raise ValueError("Only positive integers can be factorized")
+    factors: dict[int, int] = {}
+    for p in _TRIAL_PRIMES:
+        if p * p > n:
+            break
+        while n % p == 0:
+            factors[p] = factors.get(p, 0) + 1
+            n //= p
+
+    pending = [n] if n > 1 else []
+    while pending:
+        m = pending.pop()
+        if prime_sieve.is_prime(m):
+            factors[m] = factors.get(m, 0) + 1
+        else:
+            d = rho_factor(m)
+            pending.extend((d, m // d))
+    return dict(sorted(factors.items()))
+
+
+# %% [markdown]
+# ## Divisor Functions
+#
+# A smallest-prime-factor table turns any $n$ in range into its factorization
+# by repeated division, in $O(\log n)$ steps, and from there $\tau(n)$ and
+# $\sigma(n)$. Numbers beyond the table fall back to `factorize`.
+
+
+# %%
+class FactorTable:
+    """
+    Smallest prime factor of every n <= ``limit``, in a ``uint32`` array.
+
+    The table grows on demand, doubling each time, but never past
+    ``max_limit`` (4 bytes per entry).
+
+    Parameters
+    ----------
+    max_limit : int, optional
+        Largest value the table may grow to, by default 2**24.
+    """
+
+    def __init__(self, max_limit: int = 1 << 24):
+        self.max_limit = max_limit
+        self._spf = np.zeros(0, dtype=np.uint32)
+
+    @property
+    def limit(self) -> int:
+        return len(self._spf) - 1
+
+    def _extend(self, n: int) -> None:
+        """Rebuild the table so that it covers ``n``."""
+        limit = min(max(n, 2 * self.limit, 1 << 10), self.max_limit)
+        spf = np.zeros(limit + 1, dtype=np.uint32)
+        for p in prime_sieve.primes(2, isqrt(limit) + 1):
+            multiples = spf[p * p :: p]
+            multiples[multiples == 0] = p
+        unset = np.flatnonzero(spf == 0)
+        spf[unset] = unset  # primes, plus 0 and 1
+        self._spf = spf
+
+    def smallest_prime_factors(self, limit: int) -> np.ndarray:
+        """Read-only view of the table for 0 <= n <= limit."""
+        if limit > self.limit:
+            self._extend(limit)
+        view = self._spf[: limit + 1]
+        view.flags.writeable = False
+        return view
+
+    def factorize(self, n: int) -> dict[int, int]:
+        """Prime factorization of ``n``, in O(log n) steps when it is in range."""
+        if n > self.limit and n <= self.max_limit:
+            self._extend(n)
+        if n > self.limit or n < 1:
+            return factorize(n)
+        factors: dict[int, int] = {}
+        while n > 1:
+            p = int(self._spf[n])
+            factors[p] = factors.get(p, 0) + 1
+            n //= p
+        return factors
+
+    def factor_all(self, limit: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Factor every n <= ``limit`` at once.
+
+        Returns arrays ``p``, ``e`` and ``rest`` such that n = p**e * rest, where
+        p is the smallest prime factor of n and does not divide ``rest``.
+        Following ``rest`` repeatedly recovers the full factorization. Entries
+        for 0 and 1 are p = n, e = 0 and rest = n.
+        """
+        spf = self.smallest_prime_factors(limit).astype(np.int64)
+        n = np.arange(limit + 1, dtype=np.int64)
+        p, e, rest = spf.copy(), (n > 1).astype(np.int64), n // np.maximum(spf, 1)
+        rest[:2] = n[:2]
+        divisor = np.maximum(p, 1)
+        while (repeated := (rest % divisor == 0) & (n > 1)).any():
+            rest[repeated] //= p[repeated]
+            e[repeated] += 1
+        return p, e, rest
+
+    def divisor_functions(self, limit: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        tau(n) and sigma(n) for every n <= ``limit`` as ``int64`` arrays.
+
+        Uses tau(n) = (e + 1) tau(rest) and sigma(n) = (p**(e + 1) - 1) /
+        (p - 1) sigma(rest) from ``factor_all``; each pass resolves one more
+        distinct prime, so the loop runs at most ω(limit) + 1 times.
+        """
+        p, e, rest = self.factor_all(limit)
+        local_tau = e + 1
+        local_sigma = (p ** (e + 1) - 1) // np.maximum(p - 1, 1)
+        local_tau[:2] = local_sigma[:2] = 1
+        tau, sigma = local_tau.copy(), local_sigma.copy()
+        while True:
+            new_tau = local_tau * tau[rest]
+            new_sigma = local_sigma * sigma[rest]
+            new_tau[:2], new_sigma[:2] = (0, 1), (0, 1)
+            if (new_tau == tau).all() and (new_sigma == sigma).all():
+                return tau, sigma
+            tau, sigma = new_tau, new_sigma
+
+    def divisors(self, n: int) -> list[int]:
+        """Every divisor of ``n``, in increasing order."""
+        divisors = [1]
+        for p, e in self.factorize(n).items():
+            divisors = [d * p**k for d in divisors for k in range(e + 1)]
+        return sorted(divisors)
+
+
+factor_table = FactorTable()
+
+
+def divisor_count(n: int) -> int:
+    """tau(n), the number of divisors of n."""
+    return prod(e + 1 for e in factor_table.factorize(n).values())
+
+
+def divisor_sum(n: int) -> int:
+    """sigma(n), the sum of the divisors of n."""
+    return prod(
+        (p ** (e + 1) - 1) // (p - 1) for p, e in factor_table.factorize(n).items()
+    )
+
+
+def divisor_counts(limit: int) -> np.ndarray:
+    """tau(n) for every n <= ``limit``, as an ``int64`` array."""
+    counts = np.zeros(limit + 1, dtype=np.int64)
+    for d in range(1, isqrt(limit) + 1):
+        counts[d * d :: d] += 2  # d and n // d, for every n = d * k with k >= d
+        counts[d * d] -= 1
+    return counts
+
+
+def proper_divisor_sums(limit: int) -> np.ndarray:
+    """
+    Sum of the proper divisors of every n <= ``limit``, as an ``int64`` array.
+
+    Every pair d * k = n with k >= 2 contributes d to n. Divisors d <= sqrt(limit)
+    are added one d at a time along their multiples, and the larger ones one
+    cofactor k at a time, so the whole table takes O(sqrt(limit)) NumPy calls
+    and O(limit log limit) work.
+    """
+    r = isqrt(limit)
+    sums = np.zeros(limit + 1, dtype=np.int64)
+    for d in range(1, r + 1):
+        sums[2 * d :: d] += d
+    for k in range(2, limit // (r + 1) + 1):
+        top = limit // k
+        sums[k * (r + 1) : k * top + 1 : k] += np.arange(r + 1, top + 1)
+    return sums
 
 
 # %% [markdown]
@@ -98,7 +1710,7 @@ def multiples_of_3_or_5(limit: int) -> int:
 
 
 # print(multiples_of_3_or_5(10))
-print(multiples_of_3_or_5(1000))
+register(1, multiples_of_3_or_5, 1000, expected=233168)
 
 # %% [markdown]
 # ## 2. Even Fibonacci numbers
@@ -113,7 +1725,7 @@ print(multiples_of_3_or_5(1000))
 
 
 # %%
-@cache
+@memoize(max_entries=1 << 12)
 def fibonacci_rec(n: int) -> int:
     return n if n in {0, 1} else fibonacci_rec(n - 1) + fibonacci_rec(n - 2)
 
@@ -136,7 +1748,7 @@ def PE002(limit=4000000):
     return S
 
 
-understandable(int(4e6))
+register(2, understandable, int(4e6), expected=4613732)
 
 
 # %%
@@ -174,47 +1786,29 @@ def PE002_optimized(limit=4000000):
 
 
 # %%
-@lru_cache
 def is_prime(num: int) -> bool:
-    if num < 2:
-        return False
-    square_root = isqrt(num)
-    return all(num % i != 0 for i in range(2, square_root + 1))
-
+    return prime_sieve.is_prime(num)
 
-def find_factor(n, g):
-    x = 2  # starting value
-    y = x
-    d = 1
 
-    while d == 1:
-        x = g(x)
-        y = g(g(y))
-        d = gcd(abs(x - y), n)
-
-    return "failure" if d == n else d
+def find_factor(n: int, g: Callable[[int], int] | None = None) -> int:
+    return rho_factor(n, g)
 
 
 # %%
-find_factor(600851475143, lambda x: (x**2 + 1) % 600851475143)
+# %time find_factor(600851475143, lambda x: (x**2 + 1) % 600851475143)
 
 # %%
-find_factor(600851475143, lambda x: (x**2) % 600851475143)
+# %time find_factor(600851475143, lambda x: (x**2) % 600851475143)
 
 
 # %%
 @print_and_copy_answer
-def find_largest_prime_factor(n: int):
-    p = (n**0.5) + 1
-    while p > 2:
-        p = prevprime(p)
-        if n % p == 0:
-            return p
-    return n  # n is prime
+def find_largest_prime_factor(n: int) -> int:
+    return max(factorize(n), default=n)
 
 
 # %%
-find_largest_prime_factor(600851475143)
+register(3, find_largest_prime_factor, 600851475143, expected=6857)
 
 # %% [markdown]
 # ## 4. Largest Palindrome Product
@@ -227,6 +1821,7 @@ find_largest_prime_factor(600851475143)
 
 # %%
 @print_and_copy_answer
+@persistent_cache
 def largest_palindrome_product(number_digits: int = 2) -> int:
     number_range = range(10 ** (number_digits - 1), 10**number_digits)
     return max(
@@ -237,7 +1832,7 @@ def largest_palindrome_product(number_digits: int = 2) -> int:
 
 
 # assert largest_palindrome_product(2) == 9009
-largest_palindrome_product(3)
+register(4, largest_palindrome_product, 3, expected=906609)
 
 
 # %% [markdown]
@@ -258,7 +1853,7 @@ def smallest_multiple(limit: int) -> int:
 
 # assert smallest_multiple(10) == 2520, "Wrong! Answer should be 2520"
 
-smallest_multiple(20)
+register(5, smallest_multiple, 20, expected=232792560)
 
 # %% [markdown]
 # ## 6. Sum Square Difference
@@ -297,7 +1892,7 @@ def algebraic_sum_square_difference(limit: int) -> int:
 
 
 # %%
-algebraic_sum_square_difference(100)
+register(6, algebraic_sum_square_difference, 100, expected=25164150)
 
 # %%
 # %timeit algebraic_sum_square_difference(100)
@@ -312,23 +1907,16 @@ algebraic_sum_square_difference(100)
 
 
 # %%
-is_prime(13)
+# %time is_prime(13)
 
 
 @print_and_copy_answer
 def generate_nth_prime_number(n: int) -> int:
-    count = 0
-    candidate = 2  # Starting from the first prime number
-    while count < n:
-        if is_prime(candidate):
-            count += 1
-            if count == n:
-                return candidate
-        candidate += 1
+    return nth_prime(n)
 
 
 # assert generate_nth_prime_number(6) == 13
-generate_nth_prime_number(10001)
+register(7, generate_nth_prime_number, 10001, expected=104743)
 
 # %% [markdown]
 # ## 8. Largest Product in a Series
@@ -362,16 +1950,118 @@ thousand_digits = """73167176531330624919225119674426574742355349194934
 
 
 # %%
-@print_and_copy_answer
-def largest_product_series(n: int) -> int:
-    digit_sequence: str = thousand_digits
-    digits_cleaned = digit_sequence.replace("\n", "")
+def iter_digits(
+    source: str | os.PathLike | IO[str] | Iterable[str], chunk_size: int = 1 << 16
+) -> Iterator[int]:
+    """
+    Stream the decimal digits of ``source``, skipping anything else (newlines,
+    spaces).
+
+    ``source`` may be digit text, a path to a digit file, an open text file, or
+    any iterable of string chunks. A ``str`` is always digit text, so it may only
+    hold ASCII digits and whitespace; wrap file names in ``Path``. Files are read
+    ``chunk_size`` characters at a time, so memory use does not depend on their
+    size.
+
+    Raises
+    ------
+    ValueError
+        If a ``str`` source holds anything but digits and whitespace, e.g. a
+        file name.
+    """
+    if isinstance(source, os.PathLike):
+        with open(source, encoding="utf-8") as file:
+            yield from iter_digits(file, chunk_size)
+        return
+    if isinstance(source, str):
+        if stray := re.search(r"[^0-9\s]", source):
+            raise ValueError(
+                f"digit text holds {stray.group()!r} at {stray.start()}; "
+                "pass a Path to read a digit file"
+            )
+        chunks: Iterable[str] = (source,)
+    elif hasattr(source, "read"):
+        chunks = iter(lambda: source.read(chunk_size), "")
+    else:
+        chunks = source
+    for chunk in chunks:
+        yield from (ord(char) - 48 for char in chunk if "0" <= char <= "9")
+
+
+def scan_window_products(digits: Iterable[int], n: int) -> Iterator[tuple[int, int]]:
+    """
+    Yield ``(offset, product)`` for every window of ``n`` adjacent digits that
+    contains no zero.
+
+    The running product is updated in O(1) per digit: multiply in the new
+    digit, divide out the one leaving the window. A zero resets it, and no
+    window is reported until ``n`` nonzero digits have followed the last zero.
+    """
+    window: deque[int] = deque(maxlen=n)
+    running, run = 1, 0  # run counts the nonzero digits since the last zero
+    for position, digit in enumerate(digits):
+        if digit == 0:
+            running, run = 1, 0
+            window.clear()
+            continue
+        if run >= n:
+            running //= window[0]
+        window.append(digit)
+        running *= digit
+        run += 1
+        if run >= n:
+            yield position - n + 1, running
+
+
+def largest_product_window(
+    source: str | os.PathLike | IO[str] | Iterable[str], n: int
+) -> tuple[int, int]:
+    """
+    ``(product, offset)`` of the first window of ``n`` adjacent digits with the
+    greatest product, streamed from ``source`` in constant memory.
+    """
+    best_offset, best = max(
+        scan_window_products(iter_digits(source), n),
+        key=lambda window: window[1],
+        default=(-1, 0),
+    )
+    return best, best_offset
+
+
+def largest_product_window_numpy(digits: np.ndarray, n: int) -> tuple[int, int]:
+    """
+    In-memory counterpart of ``largest_product_window`` for a digit array.
+
+    Window products are compared as sums of logarithms, so nothing overflows;
+    windows within rounding of the best log-sum are then rechecked exactly.
+    """
+    digits = np.asarray(digits, dtype=np.int64)
+    if len(digits) < n:
+        return 0, -1
+    logs = np.concatenate(([0.0], np.cumsum(np.log(np.where(digits > 0, digits, 1)))))
+    zeros = np.concatenate(([0], np.cumsum(digits == 0)))
+    log_sums = logs[n:] - logs[:-n]
+    log_sums[zeros[n:] - zeros[:-n] > 0] = -np.inf
+    best = log_sums.max()
+    if np.isneginf(best):
+        return 0, -1
+    tolerance = 1e-12 * logs[-1] + 1e-9 * n  # cumulative rounding, with headroom
+    candidates = np.flatnonzero(log_sums >= best - tolerance)
     return max(
-        prod(map(int, (digits_cleaned[i : i + n])))
-        for i, _ in enumerate(digits_cleaned)
+        (
+            (prod(digits[offset : offset + n].tolist()), int(offset))
+            for offset in candidates
+        ),
+        key=lambda window: (window[0], -window[1]),
     )
 
 
+# %%
+@print_and_copy_answer
+def largest_product_series(n: int) -> int:
+    return largest_product_window(thousand_digits, n)[0]
+
+
 # %%
 def largest_product_series_gpt(n: int) -> int:
     # 4 times faster
@@ -394,7 +2084,7 @@ def largest_product_series_gpt(n: int) -> int:
 
 
 # %%
-largest_product_series(13)
+register(8, largest_product_series, 13, expected=23514624000)
 
 # %% [markdown]
 # ## 9. Special Pythagorean Triplet
@@ -423,7 +2113,7 @@ def pythagorean_triplet_sum_gpt(goal: int = 1000) -> int:
 
 
 # %%
-pythagorean_triplet_sum_gpt(1000)
+register(9, pythagorean_triplet_sum_gpt, 1000, expected=31875000)
 
 # %% [markdown]
 # ## 10. Summation of Primes
@@ -436,7 +2126,7 @@ pythagorean_triplet_sum_gpt(1000)
 # %%
 # @print_and_copy_answer
 def primes_sum_to_limit(limit: int) -> int:
-    return sum(x for x in range(limit) if is_prime(x))
+    return prime_sieve.sum_primes(limit)
 
 
 # %%
@@ -444,26 +2134,23 @@ def primes_sum_to_limit(limit: int) -> int:
 
 
 # %%
-def primes_to_limit_eratosthenes_sieve(n: int):
-    is_prime = [True] * (n + 1)
-    is_prime[0] = is_prime[1] = False
-
-    for i in range(2, int(n**0.5) + 1):
-        if is_prime[i]:
-            for j in range(i * i, n + 1, i):
-                is_prime[j] = False
-
-    return (i for i in range(n + 1) if is_prime[i])
+def primes_to_limit_eratosthenes_sieve(n: int) -> Iterator[int]:
+    return prime_sieve.primes(2, n + 1)
 
 
 # %%
 @print_and_copy_answer
-def euler_10(limit: int) -> int:
-    return sum(primes_to_limit_eratosthenes_sieve(limit))
+def euler_10(limit: int, sieve_threshold: int = 10**7) -> int:
+    if limit > sieve_threshold:
+        return prime_sum(limit)
+    return prime_sieve.sum_primes(limit + 1)
+
 
+register(10, euler_10, int(2e6), expected=142913828922)
 
 # %%
-sum(sieve(int(2e6)))
+# from more_itertools import sieve
+# %time sum(sieve(int(2e6)))
 
 # %%
 # %time euler_10(int(2e6))
@@ -525,10 +2212,132 @@ grid = """08 02 22 97 38 15 00 40 00 75 04 05 07 78 52 12 50 77 91 08
 01 70 54 71 83 51 54 69 16 92 33 48 61 43 52 01 89 19 67 48"""
 
 
+# %%
+def _parse_fixed_grid(buffer: np.ndarray) -> np.ndarray | None:
+    """
+    Fast path of ``parse_grid`` for text where every line has the same layout:
+    unsigned numbers of one width, single spaces between them. Such text is a
+    2-D byte matrix whose digit columns can be read as strided views.
+    Returns None when the text has any other layout.
+    """
+    line_breaks = np.flatnonzero(buffer[: 1 << 16] == ord("\n"))
+    spaces = np.flatnonzero(buffer[: 1 << 16] == ord(" "))
+    if len(line_breaks) == 0 or len(buffer) % (line_breaks[0] + 1):
+        return None
+    line = line_breaks[0] + 1
+    width = spaces[0] if len(spaces) and spaces[0] < line else line - 1
+    if width == 0 or line % (width + 1):
+        return None
+
+    matrix = buffer.reshape(-1, line)
+    digits = [matrix[:, k :: width + 1] - np.uint8(ord("0")) for k in range(width)]
+    if (
+        (matrix[:, -1] != ord("\n")).any()
+        or (matrix[:, width : line - 1 : width + 1] != ord(" ")).any()
+        or any((column > 9).any() for column in digits)
+    ):
+        return None
+    values = np.zeros(digits[0].shape, dtype=np.int32 if width < 10 else np.int64)
+    for column in digits:
+        values *= 10
+        values += column
+    return values.astype(np.int64)
+
+
+def parse_grid(text: str | bytes) -> np.ndarray:
+    """
+    Parse whitespace-separated integers, one row per non-empty line, into an
+    ``int64`` array.
+
+    The bytes are scanned with NumPy alone. Evenly laid out text is read as
+    strided columns of a byte matrix; anything else has its digit runs located
+    from the edges of a digit mask and folded into values one digit position
+    at a time.
+    """
+    data = text.encode("ascii") if isinstance(text, str) else text
+    if not data.endswith(b"\n"):
+        data += b"\n"
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    if (grid := _parse_fixed_grid(buffer)) is not None:
+        return grid
+
+    is_digit = np.zeros(len(buffer) + 2, dtype=np.int8)
+    is_digit[1:-1] = (buffer >= ord("0")) & (buffer <= ord("9"))
+    edges = np.flatnonzero(is_digit[1:] != is_digit[:-1])
+    starts, ends = edges[::2], edges[1::2]
+    if len(starts) == 0:
+        return np.zeros((0, 0), dtype=np.int64)
+
+    lengths = ends - starts
+    values = np.zeros(len(starts), dtype=np.int64)
+    for offset in range(lengths.max()):
+        within = lengths > offset
+        digit = buffer[np.where(within, starts + offset, 0)] - ord("0")
+        values = np.where(within, values * 10 + digit, values)
+    if b"-" in data:
+        values[(starts > 0) & (buffer[np.maximum(starts - 1, 0)] == ord("-"))] *= -1
+
+    # Numbers before each line break, hence per line; blank lines hold none
+    line_breaks = np.flatnonzero(buffer == ord("\n"))
+    per_line = np.diff(np.searchsorted(starts, line_breaks), prepend=0)
+    per_row = per_line[per_line > 0]
+    if (per_row != per_row[0]).any():
+        raise ValueError("Rows of the grid have different lengths")
+    return values.reshape(len(per_row), per_row[0])
+
+
+def load_grid(source: str | os.PathLike | np.ndarray, cache: bool = True) -> np.ndarray:
+    """
+    Integer grid from grid text, a path to a text grid, or an array.
+
+    A ``str`` is always grid text, so it may only hold ASCII digits and
+    whitespace; wrap file names in ``Path``. Arrays, memory-mapped ones
+    included, are returned unchanged. Parsed grids are saved under
+    ``CACHE_DIR`` as ``.npy`` (keyed by the text's hash, or by a file's path,
+    size and modification time) and memory-mapped on later calls, so repeated
+    runs skip parsing entirely.
+
+    Raises
+    ------
+    ValueError
+        If a ``str`` source holds anything but digits and whitespace (e.g. a
+        file name), or the source holds no numbers at all.
+    """
+    if isinstance(source, np.ndarray):
+        return source
+    if isinstance(source, os.PathLike):
+        stat = os.stat(source)
+        key = f"{os.path.abspath(source)}:{stat.st_size}:{stat.st_mtime_ns}".encode()
+    else:
+        if stray := re.search(r"[^0-9\s]", source):
+            raise ValueError(
+                f"grid text holds {stray.group()!r} at {stray.start()}; "
+                "pass a Path to read a grid file"
+            )
+        key = source.encode()
+    path = CACHE_DIR / f"grid_{hashlib.sha1(key).hexdigest()}.npy"
+    if cache and path.exists():
+        return np.load(path, mmap_mode="r")
+
+    text = Path(source).read_bytes() if isinstance(source, os.PathLike) else source
+    parsed = parse_grid(text)
+    if parsed.size == 0:
+        raise ValueError("the grid source holds no numbers")
+    if cache:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as file:
+            np.save(file, parsed)
+        os.replace(tmp, path)
+    return parsed
+
+
 # %%
 @print_and_copy_answer
-def largest_product_grid(blocksize: int, grid: str = grid) -> int:
-    np_grid = np.loadtxt(StringIO(grid))
+def largest_product_grid(
+    blocksize: int, grid: str | os.PathLike | np.ndarray = grid
+) -> int:
+    np_grid = load_grid(grid)
     m, n = np_grid.shape
 
     arr = np.zeros((m + blocksize, n + 1), int)  # pad with the right amount of zeros.
@@ -566,17 +2375,113 @@ def largest_product_grid_dict_approach(numbers: int = 4, grid: str = grid) -> in
             max_prod = max(max_prod, prod)
         return max_prod
 
-    # generate for every position in the dictionary the max_prod and print the
-    # max of this maxima
+    # generate for every position in the dictionary the max_prod and print the
+    # max of this maxima
+
+    return max(prod_adjacent(row, col) for row, col in grid_dict)
+
+
+# %%
+# %timeit largest_product_grid_dict_approach()
+
+# %% [markdown]
+# The stride trick above generalizes to any number of dimensions: in $d$
+# dimensions there are $(3^d - 1)/2$ lattice directions, and the products along
+# one of them are the sum of $n$ shifted views of the grid. Summing logarithms
+# instead of multiplying keeps huge products from overflowing `int64`; the few
+# windows closest to the best log-sum are then rechecked exactly. Tiling along
+# the first axis bounds memory by `tile_rows` whatever the size of the grid.
+
+
+# %%
+def lattice_directions(ndim: int) -> list[tuple[int, ...]]:
+    """One of each ± pair of nonzero steps in {-1, 0, 1}**ndim."""
+    return [
+        step
+        for step in product((0, 1, -1), repeat=ndim)
+        if any(step) and next(c for c in step if c) == 1
+    ]
+
 
-    return max(prod_adjacent(row, col) for row, col in grid_dict)
+def grid_max_product(
+    grid: np.ndarray, n: int, tile_rows: int = 1024, candidates: int = 8
+) -> tuple[int, tuple[int, ...] | None, tuple[int, ...] | None]:
+    """
+    Greatest product of ``n`` adjacent entries along any lattice direction.
 
+    Parameters
+    ----------
+    grid : np.ndarray
+        Array of non-negative numbers, of any shape.
+    n : int
+        Window length.
+    tile_rows : int, optional
+        Window starts processed per tile along the first axis, by default 1024.
+    candidates : int, optional
+        Windows per tile and direction rechecked exactly, by default 8.
+
+    Returns
+    -------
+    tuple
+        ``(product, start, direction)``: the entries are
+        ``grid[start + k * direction]`` for k in range(n). ``start`` and
+        ``direction`` are None when no window fits in the grid.
+    """
+    grid = np.asarray(grid)
+    if (grid < 0).any():
+        raise ValueError("Log-domain scanning needs non-negative entries")
+    best: tuple[int, tuple[int, ...] | None, tuple[int, ...] | None] = (0, None, None)
+    best_log = -np.inf
+    tolerance = 1e-9 * n
+
+    for direction in lattice_directions(grid.ndim):
+        # Flip the axes stepped backwards so every step is 0 or 1
+        view = grid[tuple(slice(None, None, -1 if c < 0 else 1) for c in direction)]
+        steps = tuple(abs(c) for c in direction)
+        valid = tuple(size - (n - 1) * s for size, s in zip(view.shape, steps))
+        if min(valid) <= 0:
+            continue
+
+        for row in range(0, valid[0], tile_rows):
+            shape = (min(tile_rows, valid[0] - row), *valid[1:])
+            slab = view[row : row + shape[0] + (n - 1) * steps[0]]
+            with np.errstate(divide="ignore"):
+                logs = np.log(slab.astype(np.float64))
+            total = np.zeros(shape)
+            for k in range(n):
+                total += logs[
+                    tuple(slice(k * s, k * s + size) for s, size in zip(steps, shape))
+                ]
+            top = total.max()
+            if top < best_log - tolerance:
+                continue
+            best_log = max(best_log, top)
+
+            flat = total.ravel()
+            picks = np.argpartition(flat, -min(candidates, flat.size))[-candidates:]
+            for pick in sorted(picks[flat[picks] >= best_log - tolerance]):
+                position = np.unravel_index(pick, shape)
+                values = [
+                    slab[tuple(p + k * s for p, s in zip(position, steps))]
+                    for k in range(n)
+                ]
+                exact = prod(np.array(values).tolist())
+                if exact > best[0] or best[1] is None:
+                    start = tuple(
+                        int(size - 1 - (p + offset) if c < 0 else p + offset)
+                        for size, p, offset, c in zip(
+                            grid.shape,
+                            position,
+                            (row, *[0] * (grid.ndim - 1)),
+                            direction,
+                        )
+                    )
+                    best = (exact, start, direction)
+    return best
 
-# %%
-# %timeit largest_product_grid_dict_approach()
 
 # %%
-largest_product_grid(4)
+register(11, largest_product_grid, 4, expected=70600674)
 
 # %% [markdown]
 # ## 12. Highly Divisible Triangular Number
@@ -612,38 +2517,31 @@ def triangle_number(n: int) -> int:
     return n * (n + 1) / 2
 
 
-@cache
 def generate_divisors(n: int) -> list[int]:
-    divisors = []
-    for d in range(1, isqrt(n) + 1):
-        if n % d == 0:
-            divisors.append(d)
-            if (
-                d != n // d
-            ):  # Avoid adding the square root twice if n is a perfect square
-                divisors.append(n // d)
-    return divisors
+    return factor_table.divisors(n) if n > 0 else []
 
 
 @print_and_copy_answer
 def highly_divisible_triangular_number(n_divisors: int = 500) -> int:
-    triangle_index = 1
-    triangle_number = 1  # First triangular number
-
+    """
+    T_k = k(k + 1)/2 and k, k + 1 are coprime, so tau(T_k) = h(k) h(k + 1) with
+    h(m) = tau(m/2) for even m and tau(m) for odd m. h is built for the whole
+    range of a tau table at once and scanned with one ``np.flatnonzero``; the
+    table doubles until some k in range qualifies.
+    """
+    size = 1 << 10
     while True:
-        # ic(triangle_number)
-        divisors = generate_divisors(triangle_number)
-        if len(divisors) >= n_divisors:
-            return triangle_number
-
-        # Move to the next triangular number
-        triangle_index += 1
-        triangle_number += (
-            triangle_index  # Update triangular number by adding the next index
-        )
+        h = divisor_counts(size)
+        h[0::2] = h[: (len(h) + 1) // 2].copy()  # h(2j) = tau(j)
+        # k runs from 1 to len(h) - 2, so that h(k + 1) is in the table.
+        hits = np.flatnonzero(h[1:-1] * h[2:] >= n_divisors)
+        if len(hits):
+            triangle_index = int(hits[0]) + 1
+            return triangle_index * (triangle_index + 1) // 2
+        size *= 2
 
 
-highly_divisible_triangular_number()
+register(12, highly_divisible_triangular_number, expected=76576500)
 
 # %% [markdown]
 # ## 13. Large Sum
@@ -760,7 +2658,7 @@ def large_sum_first_digits(large_num: str = large_number) -> str:
     return f"{sum(map(int, large_num.splitlines()))}"[:10]
 
 
-large_sum_first_digits()
+register(13, large_sum_first_digits, expected="5537376230")
 
 # %% [markdown]
 # ## 14. Longest Collatz Sequence
@@ -786,7 +2684,7 @@ large_sum_first_digits()
 
 
 # %%
-@cache
+@memoize(max_entries=1 << 16, dense=1 << 20, typecode="H")
 def collatz_sequence(n: int) -> int:
     if n == 1:
         return 1
@@ -795,12 +2693,104 @@ def collatz_sequence(n: int) -> int:
     return 1 + collatz_sequence(3 * n + 1)
 
 
+def _collatz_block(
+    lengths: np.ndarray, low: int, high: int, base: int, chunk_start: int
+) -> None:
+    """
+    Fill ``lengths[low:high]``, given that every length below ``base`` and in
+    ``[chunk_start, low)`` is already known.
+    """
+    values = np.arange(low, high, dtype=np.int64)
+    starts, steps = values.copy(), np.zeros_like(values)
+    while len(values):
+        done = (values < base) | ((values >= chunk_start) & (values < low))
+        lengths[starts[done]] = steps[done] + lengths[values[done]]
+        values, starts, steps = values[~done], starts[~done], steps[~done]
+        odd = values & 1
+        values = np.where(odd, (3 * values + 1) >> 1, values >> 1)
+        steps += 1 + odd
+
+
+def collatz_lengths(limit: int, block_size: int = 1 << 20) -> np.ndarray:
+    """
+    Collatz chain length, counting both ends, of every n < ``limit``.
+
+    Starting values are advanced together in NumPy blocks of at most
+    ``block_size``, taking (3n + 1)/2 as a single double step. A chain stops as
+    soon as it drops below the block, where every length is already known;
+    values above ``limit`` are only ever passed through, never stored.
+    """
+    lengths = np.zeros(max(limit, 2), dtype=np.uint16)
+    lengths[1] = 1
+    low = 2
+    while low < limit:
+        high = min(limit, low + min(low, block_size))
+        _collatz_block(lengths, low, high, low, low)
+        low = high
+    return lengths
+
+
+def _collatz_chunk(
+    shm_name: str, limit: int, base: int, start: int, stop: int, block_size: int
+) -> tuple[int, int]:
+    """
+    Worker for ``longest_collatz_sequence``: fill ``[start, stop)`` of the shared
+    lengths buffer and return the chunk's (longest length, starting number).
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        lengths = np.ndarray((limit,), dtype=np.uint16, buffer=shm.buf)
+        for low in range(start, stop, block_size):
+            _collatz_block(lengths, low, min(stop, low + block_size), base, start)
+        best = start + int(np.argmax(lengths[start:stop]))
+        result = int(lengths[best]), best
+        del lengths
+        return result
+    finally:
+        shm.close()
+
+
 @print_and_copy_answer
-def longest_collatz_sequence(limit: int) -> int:
-    return max(range(2, limit), key=collatz_sequence)
+@persistent_cache
+def longest_collatz_sequence(
+    limit: int, workers: int | None = None, base: int = 1 << 22
+) -> int:
+    """
+    Starting number below ``limit`` with the longest Collatz chain.
+
+    With ``workers`` > 1, the lengths below ``base`` are computed up front and
+    the rest of the range is split into chunks across a process pool. Every
+    worker writes into one ``multiprocessing.shared_memory`` buffer and returns
+    only its local best, which the parent reduces.
+    """
+    if workers is None or workers < 2 or limit <= base:
+        return int(np.argmax(collatz_lengths(limit)))
+
+    chunk_size = -(-(limit - base) // (4 * workers))  # 4 chunks per worker
+    shm = shared_memory.SharedMemory(create=True, size=2 * limit)
+    try:
+        lengths = np.ndarray((limit,), dtype=np.uint16, buffer=shm.buf)
+        lengths[:base] = collatz_lengths(base)
+        candidates = [(int(lengths[:base].max()), int(np.argmax(lengths[:base])))]
+        del lengths
+        chunks = range(base, limit, chunk_size)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            candidates += executor.map(
+                _collatz_chunk,
+                repeat(shm.name),
+                repeat(limit),
+                repeat(base),
+                chunks,
+                [min(limit, start + chunk_size) for start in chunks],
+                repeat(1 << 20),
+            )
+    finally:
+        shm.close()
+        shm.unlink()
+    return max(candidates, key=lambda candidate: (candidate[0], -candidate[1]))[1]
 
 
-longest_collatz_sequence(int(1e6))
+register(14, longest_collatz_sequence, int(1e6), expected=837799)
 
 
 # %% [markdown]
@@ -827,7 +2817,7 @@ def lattice_paths(grid_size: int) -> int:
 
 # %%
 # assert lattice_paths(2) == 6
-lattice_paths(20)
+register(15, lattice_paths, 20, expected=137846528820)
 
 
 # %% [markdown]
@@ -846,7 +2836,7 @@ def power_digit_sum(digit: int, power: int) -> int:
 
 # %%
 # assert power_digit_sum(2, 15) == 26
-power_digit_sum(2, 1000)
+register(16, power_digit_sum, 2, 1000, expected=1366)
 
 
 # %% [markdown]
@@ -865,7 +2855,7 @@ power_digit_sum(2, 1000)
 
 
 # %%
-@cache
+@memoize(max_entries=1 << 10)
 def number_to_words(n):
     if not (1 <= n <= 1000):
         return "Number out of range"
@@ -944,7 +2934,7 @@ def number_letter_counts(limit: int) -> int:
 
 # %%
 # assert number_letter_counts(5) == 19
-number_letter_counts(1000)
+register(17, number_letter_counts, 1000, expected=21124)
 
 # %% [markdown]
 # ## 18. Maximum Path Sum I
@@ -1021,13 +3011,86 @@ def max_sum(row: list[int], next_row: list[int]) -> list[int]:
     return [max(x) for x in zip(a, b)]
 
 
+def iter_triangle_rows(
+    source: str | os.PathLike | IO[str] | Iterable[str],
+) -> Iterator[np.ndarray]:
+    """
+    Stream the rows of a number triangle, top first, as ``int64`` arrays.
+
+    ``source`` may be the triangle text, a path, an open text file or any
+    iterable of lines. Files are read one line at a time.
+    """
+    if isinstance(source, os.PathLike):
+        with open(source, encoding="utf-8") as file:
+            yield from iter_triangle_rows(file)
+        return
+    lines = source.splitlines() if isinstance(source, str) else source
+    for line in lines:
+        if line.strip():
+            yield np.fromstring(line, dtype=np.int64, sep=" ")
+
+
+def max_path_sum_bottom_up(rows: list[np.ndarray]) -> int:
+    """
+    Maximum top-to-bottom path total of an in-memory triangle.
+
+    A single ``int64`` buffer starts as the bottom row and is folded upwards in
+    place: buf = max(buf[:-1], buf[1:]) + row.
+    """
+    buffer = np.array(rows[-1], dtype=np.int64)
+    for row in reversed(rows[:-1]):
+        np.maximum(buffer[:-1], buffer[1:], out=buffer[:-1])
+        buffer = buffer[:-1]
+        buffer += row
+    return int(buffer[0])
+
+
+def max_path_sum(
+    rows: Iterable[np.ndarray], return_path: bool = False
+) -> int | tuple[int, list[int]]:
+    """
+    Maximum top-to-bottom path total, streaming the rows top-down.
+
+    Only the best totals ending at each position of the current row are held,
+    so memory is proportional to the triangle's width, not its size. With
+    ``return_path`` the choice made at every entry is also kept, packed into
+    bits, and the column index of the best path in each row is returned
+    alongside the total.
+    """
+    best = np.zeros(0, dtype=np.int64)
+    from_left: list[np.ndarray] = []
+    for row in rows:
+        totals = np.empty(len(row), dtype=np.int64)
+        if len(best):
+            totals[0], totals[-1] = best[0], best[-1]
+            np.maximum(best[:-1], best[1:], out=totals[1:-1])
+        else:
+            totals[:] = 0
+        totals += row
+        if return_path:
+            left = np.zeros(len(row), dtype=bool)
+            left[-1] = len(row) > 1
+            left[1:-1] = best[:-1] >= best[1:]
+            from_left.append(np.packbits(left))
+        best = totals
+
+    total = int(best.max())
+    if not return_path:
+        return total
+    column = int(best.argmax())
+    path = [column]
+    for depth in range(len(from_left) - 1, 0, -1):
+        column -= int(np.unpackbits(from_left[depth])[column])
+        path.append(column)
+    return total, path[::-1]
+
+
 @print_and_copy_answer
 def solution(triangle_str: str) -> int:
-    triangle_array = triangle_to_array(triangle_str)
-    return reduce(max_sum, triangle_array[::-1])[0]
+    return max_path_sum_bottom_up(list(iter_triangle_rows(triangle_str)))
 
 
-solution(triangle)
+register(18, solution, triangle, expected=1074)
 
 # %% [markdown]
 # ## 19. Counting Sundays
@@ -1048,13 +3111,106 @@ solution(triangle)
 # (1 Jan 1901 to 31 Dec 2000)?
 
 # %%
-nums, _ = (
-    pd.DataFrame(index=pd.date_range("1/1/1901", "12/31/2000", freq="W-SUN"))
-    .loc[lambda d: d.index.day == 1]
-    .shape
-)
+# Sakamoto's month offsets: the weekday shift of the first of each month relative
+# to a year starting in March, so February's leap day falls at the year's end.
+_SAKAMOTO_OFFSETS = np.array([0, 3, 2, 5, 0, 3, 5, 1, 4, 6, 2, 4])
+_MONTH_LENGTHS = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+# 400 Gregorian years are 146097 days, exactly 20871 weeks, so the calendar
+# repeats weekday for weekday with this period.
+_GREGORIAN_CYCLE = 400
+
+
+def day_of_week(year, month, day) -> np.ndarray:
+    """
+    Weekday of Gregorian dates by Sakamoto's method, broadcasting over arrays.
+
+    Monday is 0 and Sunday is 6, as with ``date.weekday``. Years before 1 are
+    proleptic (year 0 is 1 BC).
+    """
+    month = np.asarray(month)
+    year = np.asarray(year) - (month < 3)
+    return (
+        year
+        + year // 4
+        - year // 100
+        + year // 400
+        + _SAKAMOTO_OFFSETS[month - 1]
+        + day
+        + 6
+    ) % 7
+
+
+def days_in_month(year, month) -> np.ndarray:
+    """Length of each month, broadcasting over arrays."""
+    year, month = np.asarray(year), np.asarray(month)
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    return _MONTH_LENGTHS[month - 1] + (leap & (month == 2))
+
+
+@memoize
+def _weekday_cycle_counts() -> np.ndarray:
+    """
+    Cumulative weekday counts over one 400-year cycle, built on first use.
+
+    Entry ``[y, d, w]`` is the number of months in the first ``y`` years of the
+    cycle whose day ``d`` exists and falls on weekday ``w``.
+    """
+    years = np.arange(_GREGORIAN_CYCLE)[:, None, None]
+    months = np.arange(1, 13)[None, :, None]
+    days = np.arange(1, 32)[None, None, :]
+    years, months, days = np.broadcast_arrays(years, months, days)
+    exists = days <= days_in_month(years, months)
+    counts = np.zeros((_GREGORIAN_CYCLE + 1, 32, 7), dtype=np.int64)
+    np.add.at(
+        counts,
+        (years[exists] + 1, days[exists], day_of_week(years, months, days)[exists]),
+        1,
+    )
+    return counts.cumsum(axis=0)
+
+
+def _months_before(year: np.ndarray, calendar_day, weekday) -> np.ndarray:
+    counts = _weekday_cycle_counts()
+    cycles, year = np.divmod(year, _GREGORIAN_CYCLE)
+    return (
+        cycles * counts[_GREGORIAN_CYCLE, calendar_day, weekday]
+        + counts[year, calendar_day, weekday]
+    )
+
+
+def weekday_counts(first_year, last_year, weekday, calendar_day) -> np.ndarray:
+    """
+    Count the months in which a calendar day falls on a weekday, in O(1) per query.
+
+    Every argument broadcasts, so many queries can be answered at once. Months too
+    short to contain ``calendar_day`` are not counted.
+
+    Parameters
+    ----------
+    first_year, last_year : array_like of int
+        inclusive range of years; empty ranges count as zero
+    weekday : array_like of int
+        day of the week, where Monday is 0 and Sunday is 6
+    calendar_day : array_like of int
+        day of the month, from 1 to 31
+
+    Returns
+    -------
+    np.ndarray
+    """
+    first_year = np.asarray(first_year, dtype=np.int64)
+    last_year = np.maximum(np.asarray(last_year, dtype=np.int64), first_year - 1)
+    weekday, calendar_day = np.asarray(weekday), np.asarray(calendar_day)
+    if np.any((weekday < 0) | (weekday > 6)):
+        raise ValueError("weekday must be between 0 and 6")
+    if np.any((calendar_day < 1) | (calendar_day > 31)):
+        raise ValueError("calendar_day must be between 1 and 31")
+    return _months_before(last_year + 1, calendar_day, weekday) - _months_before(
+        first_year, calendar_day, weekday
+    )
 
 
+# %%
 @print_and_copy_answer
 def count_weekday_date_range(
     lower_limit_year: int = 1901,
@@ -1081,14 +3237,12 @@ def count_weekday_date_range(
     -------
     int
     """
-    return sum(
-        date(year, month, calendar_day).weekday() == weekday
-        for year in range(lower_limit_year, upper_limit_year + 1)
-        for month in range(1, 12 + 1)
+    return int(
+        weekday_counts(lower_limit_year, upper_limit_year, weekday, calendar_day)
     )
 
 
-count_weekday_date_range()
+register(19, count_weekday_date_range, expected=171)
 
 # %% [markdown]
 # ## 20. Factorial Digit Sum
@@ -1108,7 +3262,7 @@ def factorial_digit_sum(number: int) -> int:
     return sum(map(int, f"{factorial(number)}"))
 
 
-factorial_digit_sum(100)
+register(20, factorial_digit_sum, 100, expected=648)
 
 # %% [markdown]
 # ## 21. Amicable Numbers
@@ -1127,7 +3281,6 @@ factorial_digit_sum(100)
 
 
 # %%
-@cache
 def sum_proper_divisors(n: int) -> int:
     """
     Sum of proper divisors of n.
@@ -1135,19 +3288,23 @@ def sum_proper_divisors(n: int) -> int:
     Proper divisors are all divisors smaller than n.
 
     """
-    return sum(generate_divisors(n)) - n
+    return divisor_sum(n) - n if n > 0 else 0
 
 
 @print_and_copy_answer
+@persistent_cache
 def amicable_numbers(limit: int) -> int:
-    return sum(
-        a
-        for a in range(limit)
-        if (b := sum_proper_divisors(a)) != a and sum_proper_divisors(b) == a
-    )
+    d = proper_divisor_sums(limit)
+    a = np.arange(limit)
+    b = d[:limit]
+    in_range = b <= limit
+    d_of_b = d[np.where(in_range, b, 0)]
+    # Partners beyond the table are looked up one at a time
+    d_of_b[~in_range] = [sum_proper_divisors(n) for n in b[~in_range].tolist()]
+    return int(a[(b != a) & (d_of_b == a)].sum())
 
 
-amicable_numbers(10000)
+register(21, amicable_numbers, 10000, expected=31626)
 
 # %% [markdown]
 # ## 22. Names Scores
@@ -1162,40 +3319,305 @@ amicable_numbers(10000)
 #
 # What is the total of all the name scores in the file?
 
+
 # %%
-names = open_input("0022_names.txt")
+def read_names(filename: str | os.PathLike) -> list[str]:
+    return list(iter_records(filename, ",", strip_chars='"\r\n '))
 
 
 # %%
 # @print_and_copy_answer
-def name_scores(name_list_str: str) -> int:
+def name_scores(names: list[str]) -> int:
     alphabet: dict[str, int] = dict(
         zip(map(chr, range(ord("a"), ord("z") + 1)), range(1, 26 + 1))
     )
     return sum(
         prod((i, sum(map(lambda letter: alphabet[letter], name))))
-        for i, name in enumerate(
-            sorted(name_list_str.lower().replace('"', "").split(",")), start=1
-        )
+        for i, name in enumerate(sorted(name.lower() for name in names), start=1)
     )
 
 
 # %%
 @print_and_copy_answer
-def name_scores_sug(name_list_str: str) -> int:
-    @cache
+def name_scores_sug(names: list[str]) -> int:
     def letter_score(letter: str) -> int:
         return ord(letter) - ord("a") + 1
 
     return sum(
         i * sum(letter_score(letter) for letter in name)
-        for i, name in enumerate(
-            sorted(name_list_str.lower().replace('"', "").split(",")), start=1
-        )
+        for i, name in enumerate(sorted(name.lower() for name in names), start=1)
+    )
+
+
+# %time name_scores_sug(cached_parse(DATA_DIR / "0022_names.txt", read_names))
+
+
+# %%
+def read_name_bytes(
+    source: str | os.PathLike | bytes, use_mmap: bool = False
+) -> np.ndarray:
+    """
+    Raw bytes of a names list as a ``uint8`` array.
+
+    ``source`` is a path or the file contents. With ``use_mmap`` the file is
+    mapped read-only instead of read, so the page cache backs the array.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return np.frombuffer(source, dtype=np.uint8)
+    if use_mmap:
+        return np.frombuffer(mmap_input(source), dtype=np.uint8)
+    return np.frombuffer(Path(source).read_bytes(), dtype=np.uint8)
+
+
+def split_names(data: np.ndarray, strip: bool = True) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Start and end offsets of the names in a ``"A","B",...`` byte array.
+
+    Names are the spans between pairs of double quotes. Unquoted input is split
+    on commas instead, ignoring surrounding whitespace unless ``strip`` is
+    false, in which case it always holds at least one (possibly empty) name.
+    """
+    quotes = np.flatnonzero(data == ord('"'))
+    if len(quotes):
+        return quotes[0::2] + 1, quotes[1::2]
+    low, high = 0, len(data)
+    if strip:
+        text = np.flatnonzero(data > ord(" "))
+        if not len(text):
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+        low, high = text[0], text[-1] + 1
+    commas = np.flatnonzero(data == ord(","))
+    return (
+        np.concatenate(([low], commas + 1)),
+        np.concatenate((commas, [high])),
     )
 
 
-name_scores(names)
+def name_letter_sums(
+    data: np.ndarray, starts: np.ndarray, ends: np.ndarray
+) -> np.ndarray:
+    """
+    Alphabetical value of every name, where A (or a) is 1 and Z is 26.
+
+    Letters are case-folded by clearing bit 5 and offset by 64, then each name
+    is summed with one ``np.add.reduceat`` over interleaved start/end offsets.
+    """
+    if not len(starts):
+        return np.zeros(0, dtype=np.int64)
+    values = (data & 0xDF).view(np.int8)
+    values -= 64
+    # reduceat sums [starts[i], ends[i]) at even positions; the odd positions
+    # sum the separators in between and are discarded. The final segment runs
+    # to the end of the array, so its trailing bytes are subtracted.
+    bounds = np.minimum(np.column_stack((starts, ends)).ravel()[:-1], len(data) - 1)
+    sums = np.add.reduceat(values, bounds, dtype=np.int64)[0::2]
+    sums[-1] -= values[ends[-1] :].sum(dtype=np.int64)
+    sums[ends == starts] = 0
+    return sums
+
+
+def _name_words(
+    data: np.ndarray,
+    starts: np.ndarray,
+    lengths: np.ndarray,
+    rows: np.ndarray | slice,
+    word: int,
+) -> np.ndarray:
+    """
+    Bytes ``8 * word`` to ``8 * word + 7`` of the names in ``rows``, upper-cased
+    and NUL-padded, as big-endian ``uint64`` values.
+    """
+    starts, lengths = starts[rows], lengths[rows]
+    words = np.zeros(len(starts), dtype=np.uint64)
+    for column in range(8 * word, 8 * word + 8):
+        present = lengths > column
+        letters = np.where(present, data[np.where(present, starts + column, 0)], 0)
+        lower = (letters >= ord("a")) & (letters <= ord("z"))
+        words <<= np.uint64(8)
+        words |= np.where(lower, letters - 32, letters).astype(np.uint64)
+    return words
+
+
+def sort_names(data: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Order that sorts the names, case-insensitively, as ``sorted`` would.
+
+    Each name is read eight bytes at a time as a big-endian ``uint64`` word,
+    NUL-padded, whose integer order is the byte order of the names, prefixes
+    first. The first word of every name is argsorted; after that only the names
+    still tied with a neighbour have their next word built and re-sorted within
+    their run. Working memory is therefore a few words per name, however long
+    the longest one is. Equal names score the same, so the sort need not be
+    stable.
+    """
+    lengths = ends - starts
+    if not lengths.any():
+        return np.arange(len(starts))
+    first = _name_words(data, starts, lengths, slice(None), 0)
+    order = np.argsort(first)
+    same = first[order][1:] == first[order][:-1]  # same[i]: order[i] ties i + 1
+    del first
+    word = 1
+    while True:
+        (tied,) = np.nonzero(np.append(same, False) | np.insert(same, 0, False))
+        if not len(tied):
+            break
+        rows = order[tied]
+        if lengths[rows].max() <= 8 * word:
+            break  # the remaining ties are equal names
+        runs = np.cumsum(~np.insert(same, 0, False))[tied]
+        words = _name_words(data, starts, lengths, rows, word)
+        resorted = np.lexsort((words, runs))
+        order[tied] = rows[resorted]
+        words = words[resorted]
+        # A tied position's successor is the next tied one, in the same run.
+        same[tied[:-1]] &= words[1:] == words[:-1]
+        word += 1
+    return order
+
+
+def total_name_score(
+    source: str | os.PathLike | bytes = DATA_DIR / "0022_names.txt",
+    use_mmap: bool = True,
+    memory_budget: int | None = None,
+) -> int:
+    """
+    Total name score of a names file without per-character Python work.
+
+    Parameters
+    ----------
+    source : str | os.PathLike | bytes, optional
+        path to, or contents of, a ``"A","B",...`` names list
+    use_mmap : bool, optional
+        map the file instead of reading it, by default True
+    memory_budget : int | None, optional
+        files larger than this many bytes are scored with
+        ``total_name_score_external`` instead, by default None (no limit)
+
+    Returns
+    -------
+    int
+    """
+    if (
+        memory_budget is not None
+        and not isinstance(source, (bytes, bytearray, memoryview))
+        and os.path.getsize(source) > memory_budget
+    ):
+        return total_name_score_external(source, memory_budget)
+    data = read_name_bytes(source, use_mmap)
+    starts, ends = split_names(data)
+    order = sort_names(data, starts, ends)
+    sums = name_letter_sums(data, starts, ends)[order]
+    return int(np.dot(np.arange(1, len(sums) + 1, dtype=np.int64), sums))
+
+
+def _spill_sorted_names(chunk: bytes, directory: str) -> str:
+    """Sort the whole names in ``chunk`` and write them, case-folded, one per line."""
+    data = np.frombuffer(chunk, dtype=np.uint8)
+    lower = (data >= ord("a")) & (data <= ord("z"))
+    folded = np.where(lower, data - 32, data).astype(np.uint8).tobytes()
+    starts, ends = split_names(data, strip=False)
+    order = sort_names(data, starts, ends)
+    with tempfile.NamedTemporaryFile("wb", dir=directory, delete=False) as file:
+        file.writelines(
+            folded[start:end] + b"\n"
+            for start, end in zip(starts[order].tolist(), ends[order].tolist())
+        )
+    return file.name
+
+
+def _name_batches(chunk: bytes, max_names: int) -> Iterator[bytes]:
+    """``chunk`` cut at commas into pieces of at most ``max_names`` names."""
+    commas = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == ord(","))
+    cuts = commas[max_names - 1 :: max_names].tolist()
+    del commas
+    for start, end in zip([-1] + cuts, cuts + [len(chunk)]):
+        yield chunk[start + 1 : end]
+
+
+def total_name_score_external(
+    source: str | os.PathLike,
+    memory_budget: int = 1 << 28,
+    batch_size: int = 1 << 16,
+    tmpdir: str | os.PathLike | None = None,
+) -> int:
+    """
+    Total name score of a names file larger than memory, by external merge sort.
+
+    The file is read in chunks of ``memory_budget / 16`` bytes and each chunk is
+    cut back to its last comma so no name is split. Sorting needs about 16
+    working bytes per input byte for typical names but up to about 128 per name
+    however short, so a chunk is further cut into batches of at most
+    ``memory_budget / 128`` names before sorting. Whitespace is stripped
+    from the ends of the file only, as the in-memory path does. Each chunk is
+    sorted with ``sort_names`` and spilled to a temporary file. The spills are
+    then k-way merged with ``heapq.merge`` and scored ``batch_size`` names at a
+    time with ``name_letter_sums``, so the result equals ``total_name_score``.
+
+    Parameters
+    ----------
+    source : str | os.PathLike
+        path to a ``"A","B",...`` names list
+    memory_budget : int, optional
+        approximate peak working memory in bytes, by default 256 MiB
+    batch_size : int, optional
+        names scored per vectorized batch while merging, by default 65536 (fewer
+        under a small ``memory_budget``)
+    tmpdir : str | os.PathLike | None, optional
+        where to spill sorted runs, by default the system temporary directory
+
+    Returns
+    -------
+    int
+    """
+    chunk_bytes = max(memory_budget // 16, 1 << 12)
+    chunk_names = max(memory_budget // 128, 1 << 8)
+    with tempfile.TemporaryDirectory(dir=tmpdir) as directory:
+        runs = []
+        carry, quoted = b"", False
+        for block in iter_chunks(source, chunk_bytes, encoding=None):
+            if carry or runs:
+                carry += block
+            else:
+                carry = block.lstrip()
+                quoted = carry.startswith(b'"')
+            cut = carry.rfind(b",")
+            if cut >= 0:
+                for batch in _name_batches(carry[:cut], chunk_names):
+                    runs.append(_spill_sorted_names(batch, directory))
+                carry = carry[cut + 1 :]
+        # A trailing comma only ends an empty name in an unquoted list.
+        if carry.strip() or (runs and not quoted):
+            for batch in _name_batches(carry.rstrip(), chunk_names):
+                runs.append(_spill_sorted_names(batch, directory))
+
+        # The merge's read buffers and batches share the budget too.
+        buffering = min(1 << 16, max(memory_budget // (4 * len(runs) or 1), 1 << 10))
+        batch_size = min(batch_size, max(memory_budget // 256, 1 << 10))
+        files = [open(run, "rb", buffering=buffering) for run in runs]
+        try:
+            merged = heapq.merge(*files)
+            total, position = 0, 0
+            while batch := list(islice(merged, batch_size)):
+                data = np.frombuffer(b"".join(batch), dtype=np.uint8)
+                ends = np.flatnonzero(data == ord("\n"))
+                starts = np.insert(ends[:-1] + 1, 0, 0)
+                sums = name_letter_sums(data, starts, ends)
+                ranks = np.arange(position + 1, position + len(sums) + 1)
+                total += int(np.dot(ranks, sums))
+                position += len(sums)
+        finally:
+            for file in files:
+                file.close()
+    return total
+
+
+@print_and_copy_answer
+def name_scores_numpy(source=DATA_DIR / "0022_names.txt") -> int:
+    return total_name_score(source)
+
+
+register(22, name_scores_numpy, DATA_DIR / "0022_names.txt", expected=871198282)
 
 
 # %% [markdown]
@@ -1222,7 +3644,7 @@ name_scores(names)
 
 
 # %%
-@cache
+@memoize(dense=28124, typecode="b")
 def is_abundant(n: int) -> int:
     # deficient, perfect, abundant = -1, 0, 1
     sum_proper_divisors_calc = sum_proper_divisors(n)
@@ -1231,9 +3653,15 @@ def is_abundant(n: int) -> int:
     return calculate_abundance > 0
 
 
+# %%
+def abundant_numbers(limit: int) -> np.ndarray:
+    """Every abundant number <= limit, in increasing order."""
+    return np.flatnonzero(proper_divisor_sums(limit) > np.arange(limit + 1))
+
+
 # %%
 def sum_of_non_abundant_sums_norvig(limit: int) -> int:
-    abundants = {i for i in range(1, limit) if sum_proper_divisors(i) > i}
+    abundants = set(abundant_numbers(limit - 1).tolist())
 
     def abundantsum(i: int) -> bool:
         return any(i - a in abundants for a in abundants)
@@ -1242,20 +3670,24 @@ def sum_of_non_abundant_sums_norvig(limit: int) -> int:
 
 
 # %%
-print(sum_of_non_abundant_sums_norvig(28123))
+# %time sum_of_non_abundant_sums_norvig(28123)
 
 
 # %%
 @print_and_copy_answer
+@persistent_cache
 def sum_of_non_abundant_sums(limit) -> int:
-    abundant = (i for i in range(1, limit + 1) if is_abundant(i))
-    abundant_sums = {
-        a + b for a, b in combinations_with_replacement(abundant, 2) if a + b < limit
-    }
-    return sum(set(range(limit)) - abundant_sums)
+    abundant = abundant_numbers(limit)
+    is_abundant_sum = np.zeros(limit, dtype=bool)
+    for i, a in enumerate(abundant.tolist()):
+        if 2 * a >= limit:
+            break
+        sums = a + abundant[i:]
+        is_abundant_sum[sums[sums < limit]] = True
+    return int(np.flatnonzero(~is_abundant_sum).sum())
 
 
-sum_of_non_abundant_sums(28123)
+register(23, sum_of_non_abundant_sums, 28123, expected=4179871)
 
 
 # %% [markdown]
@@ -1274,12 +3706,14 @@ sum_of_non_abundant_sums(28123)
 
 # %%
 @print_and_copy_answer
+@persistent_cache
 def lexicographic_permutations(digits: range = range(10), index: int = int(1e6)) -> int:
     permutation_with_index = next(islice(enumerate(permutations(digits)), index, None))
     return int("".join(map(str, permutation_with_index[1])))
 
 
-lexicographic_permutations(range(10), int(1e6))
+# `index` counts from zero, so the millionth permutation is at 999,999.
+register(24, lexicographic_permutations, range(10), int(1e6) - 1, expected=2783915460)
 
 # %% [markdown]
 # ## 25. 1000-Digit Fibonacci Number
@@ -1314,7 +3748,7 @@ lexicographic_permutations(range(10), int(1e6))
 # %%
 @print_and_copy_answer
 def term_n_digit_long_fibonacci_num(n: int) -> int:
-    @cache
+    @memoize(max_entries=1 << 12)
     def fibonacci_rec(n: int) -> int:
         return n if n in {0, 1} else fibonacci_rec(n - 1) + fibonacci_rec(n - 2)
 
@@ -1339,7 +3773,7 @@ def binet_formula(n: int) -> int:
 
 
 # %%
-term_n_digit_long_fibonacci_num(1000)
+register(25, term_n_digit_long_fibonacci_num, 1000, expected=4782)
 
 # %% [markdown]
 # ## 26. Reciprocal Cycles
@@ -1430,7 +3864,7 @@ def A051626(n: int) -> int:
     )
 
 
-longest_reciprocal_cycle()
+register(26, longest_reciprocal_cycle, expected=983)
 
 # %% [markdown]
 # ## 27. Quadratic Primes
@@ -1471,7 +3905,7 @@ def slow_quadratic_primes() -> int:
 
     for a, b in product(range(-999, 1000), range(-1000, 1001)):
         n = 0
-        while isprime(n**2 + (a * n) + b):
+        while is_prime(n**2 + (a * n) + b):
             n += 1
         if n > best_run:
             best_run = n
@@ -1520,13 +3954,13 @@ def fastest_quadratic_primes(limit: int = 1000) -> int:
     -59231  # This is the product of -61 and 971
     """
     best_run = best_product = 0
-    sieve_of_b = [b for b in sieve(limit) if b in range(41, limit)]
+    sieve_of_b = list(prime_sieve.primes(41, limit))
 
     pairs = [(sign * isqrt(-163 + (4 * b)), b) for b in sieve_of_b for sign in (1, -1)]
 
     for a, b in pairs:
         n = 0
-        while isprime(n**2 + (a * n) + b):
+        while is_prime(n**2 + (a * n) + b):
             n += 1
         if n > best_run:
             best_run = n
@@ -1534,7 +3968,7 @@ def fastest_quadratic_primes(limit: int = 1000) -> int:
     return best_product
 
 
-fastest_quadratic_primes()
+register(27, fastest_quadratic_primes, expected=-59231)
 
 
 # %% [markdown]
@@ -1655,7 +4089,7 @@ def sum_diagonal_spiral_math(spiral_size: int) -> int:
     )
 
 
-sum_diagonal_spiral_math(1001)
+register(28, sum_diagonal_spiral_math, 1001, expected=669171001)
 
 
 # %% [markdown]
@@ -1707,10 +4141,10 @@ def distinct_powers(lower_bound: int, higher_bound: int) -> int:
 
 
 # %%
-distinct_powers(2, 5)
+# %time distinct_powers(2, 5)
 
 # %%
-distinct_powers(2, 100)
+register(29, distinct_powers, 2, 100, expected=9183)
 
 
 # %% [markdown]
@@ -1737,8 +4171,8 @@ distinct_powers(2, 100)
 
 # %%
 @print_and_copy_answer
+@persistent_cache
 def digit_n_powers(exponent: int) -> int:
-    @lru_cache
     def sum_digit_number_to_power(number: int, exponent: int) -> int:
         return sum(pow(int(digit), exponent) for digit in str(number))
 
@@ -1749,7 +4183,7 @@ def digit_n_powers(exponent: int) -> int:
     )
 
 
-digit_n_powers(5)
+register(30, digit_n_powers, 5, expected=443839)
 
 
 # %% [markdown]
@@ -1782,7 +4216,13 @@ def count_coin_combinations(target: int, coins: list[int]):
     return ways[target]
 
 
-count_coin_combinations(target=200, coins=[1, 2, 5, 10, 20, 50, 100, 200])
+register(
+    31,
+    count_coin_combinations,
+    target=200,
+    coins=[1, 2, 5, 10, 20, 50, 100, 200],
+    expected=73682,
+)
 
 
 # %% [markdown]
@@ -1805,6 +4245,7 @@ count_coin_combinations(target=200, coins=[1, 2, 5, 10, 20, 50, 100, 200])
 
 # %%
 @print_and_copy_answer
+@persistent_cache
 def pandigital_digit_sum(upper_limit: int = 9) -> int:
     """
     Calculate the sum of unique products from pandigital multiplication
@@ -1858,7 +4299,7 @@ def pandigital_digit_sum(upper_limit: int = 9) -> int:
 
 
 # %%
-pandigital_digit_sum(9)
+register(32, pandigital_digit_sum, 9, expected=45228)
 
 # %% [markdown]
 # ## 33. Digit Cancelling Fractions
@@ -1912,7 +4353,7 @@ def find_valid_fractions() -> int:
 
 
 # %%
-find_valid_fractions()
+register(33, find_valid_fractions, expected=100)
 
 # %% [markdown]
 # ## 34. Digit Factorials
@@ -1927,6 +4368,7 @@ find_valid_fractions()
 
 # %%
 @print_and_copy_answer
+@persistent_cache
 def digit_factorials(upper_limit: int) -> int:
     return sum(
         i
@@ -1936,7 +4378,7 @@ def digit_factorials(upper_limit: int) -> int:
 
 
 # %%
-digit_factorials(int(1e5))
+register(34, digit_factorials, int(1e5), expected=40730)
 
 # %% [markdown]
 # ## 35. Circular Primes
@@ -1952,8 +4394,9 @@ digit_factorials(int(1e5))
 
 # %%
 @print_and_copy_answer
+@persistent_cache
 def circular_primes(limit: int = int(1e6)) -> int:
-    primes = set(primes_to_limit_eratosthenes_sieve(limit))
+    primes = open_prime_table(limit + 1)
     return sum(
         all(
             (
@@ -1963,11 +4406,11 @@ def circular_primes(limit: int = int(1e6)) -> int:
                 )
             )
         )
-        for num in primes
+        for num in primes.primes()
     )
 
 
-circular_primes()
+register(35, circular_primes, expected=55)
 
 
 # %% [markdown]
@@ -1991,6 +4434,7 @@ def palindrome_check(num: str | int) -> bool:
 
 # %%
 @print_and_copy_answer
+@persistent_cache
 def double_base_palindromes(limit: int = int(1e6)) -> int:
     return sum(
         digit
@@ -1999,7 +4443,7 @@ def double_base_palindromes(limit: int = int(1e6)) -> int:
     )
 
 
-double_base_palindromes()
+register(36, double_base_palindromes, expected=872187)
 
 
 # %% [markdown]
@@ -2020,11 +4464,11 @@ double_base_palindromes()
 # %%
 # First draft
 def truncatable_primes_draft(limit: int = int(1e6)) -> int:
-    primes = set(primes_to_limit_eratosthenes_sieve(limit))
+    primes = open_prime_table(limit + 1)
 
     truncatable = set()
 
-    for prime in primes:
+    for prime in primes.primes():
         checks = []
         str_test = str(prime)
         for i in range(len(str_test)):
@@ -2041,12 +4485,13 @@ def truncatable_primes_draft(limit: int = int(1e6)) -> int:
 
 # %%
 @print_and_copy_answer
+@persistent_cache
 def truncatable_primes(limit: int = int(1e6)) -> int:
-    primes = set(primes_to_limit_eratosthenes_sieve(limit))
+    primes = open_prime_table(limit + 1)
     return sum(
         {
             prime
-            for prime in primes
+            for prime in primes.primes()
             if (str_prime := str(prime))
             and all(
                 int(str_prime[i:]) in primes
@@ -2058,7 +4503,7 @@ def truncatable_primes(limit: int = int(1e6)) -> int:
     )
 
 
-truncatable_primes()
+register(37, truncatable_primes, expected=748317)
 
 
 # %%
@@ -2134,3 +4579,528 @@ def truncatable_primes_fastest() -> int:
 # What is the largest **1** to **9** pandigital **9**-digit number that can be
 # formed as the concatenated product of an integer with **(1,2, ⋯, n)** where
 # **n > 1**?
+
+
+# %% [markdown]
+# ## Benchmarks
+#
+# Every registered problem, and every `%timeit`/`%time` line in a problem's
+# notes, is a candidate benchmark case. Each one also brings in the other
+# functions of that problem that accept the same arguments, so
+# `understandable(4000000)` brings in `PE002`, `PE002_optimized` and
+# `understandable_faster`. A candidate is only timed if its first (warm-up) call
+# returns the problem's registered answer, which drops helpers such as
+# `collatz_lengths` and worked examples such as `is_prime(13)`. Timings are
+# medians over adaptive repeats with the garbage collector off, with the
+# inter-quartile range for spread and the `tracemalloc` peak of one extra run.
+
+
+# %%
+def _problem_sections(lines: list[str]) -> list[tuple[int, int]]:
+    return [
+        (number, int(match.group(1)))
+        for number, line in enumerate(lines, start=1)
+        if (match := re.match(r"# ## (\d+)\.", line))
+    ]
+
+
+def _timed_calls(source: str) -> Iterator[tuple[int, ast.Call, str]]:
+    """Line, call and call text of every ``%time``/``%timeit`` line in ``source``."""
+    for number, line in enumerate(source.splitlines(), start=1):
+        if match := re.match(r"# %time(?:it)? (.+)$", line):
+            call = ast.parse(match.group(1), mode="eval").body
+            if isinstance(call, ast.Call) and isinstance(call.func, ast.Name):
+                yield number, call, match.group(1)
+
+
+def discover_benchmarks(
+    namespace: dict | None = None, source: str | os.PathLike = __file__
+) -> dict[int, dict[str, Callable[[], object]]]:
+    """
+    Candidate benchmark cases of every problem, as zero-argument callables by
+    label, the registered solver first. Their answers are not checked here; see
+    ``run_benchmarks``.
+
+    Parameters
+    ----------
+    namespace : dict | None, optional
+        where the solvers and ``PROBLEMS`` live and ``%time`` arguments are
+        evaluated, by default this module's globals
+    source : str | os.PathLike, optional
+        the file to scan, by default this file
+
+    Returns
+    -------
+    dict[int, dict[str, Callable[[], object]]]
+        problem number to ``{"solver(args)": case}``
+    """
+    namespace = globals() if namespace is None else namespace
+    text = Path(source).read_text(encoding="utf-8")
+    sections = _problem_sections(text.splitlines())
+
+    def section(line: int) -> int | None:
+        return max(
+            (problem for start, problem in sections if start < line), default=None
+        )
+
+    owners = {
+        node.name: section(node.lineno)
+        for node in ast.parse(text).body
+        if isinstance(node, ast.FunctionDef) and not node.name.startswith("_")
+    }
+
+    references = [
+        (
+            problem.number,
+            problem.solver.__name__,
+            problem.args,
+            problem.kwargs,
+            repr(problem),
+        )
+        for problem in namespace["PROBLEMS"].values()
+    ]
+    for line, call, label in _timed_calls(text):
+        solver = ast.unparse(call.func)
+        if solver in owners and section(line) is not None:
+            args = tuple(eval(ast.unparse(arg), namespace) for arg in call.args)
+            kwargs = {
+                keyword.arg: eval(ast.unparse(keyword.value), namespace)
+                for keyword in call.keywords
+            }
+            if not any(
+                reference[1:4] == (solver, args, kwargs) for reference in references
+            ):
+                references.append((section(line), solver, args, kwargs, label))
+
+    cases: dict[int, dict[str, Callable[[], object]]] = {}
+    for problem, solver, args, kwargs, label in references:
+        reference = list(signature(namespace[solver]).bind(*args, **kwargs).arguments)
+        arguments = label[len(solver) :]
+        for name in [solver] + [name for name in owners if owners[name] == problem]:
+            try:
+                bound = signature(namespace[name]).bind(*args, **kwargs)
+            except TypeError:
+                continue
+            if list(bound.arguments) == reference:
+                cases.setdefault(problem, {})[name + arguments] = partial(
+                    namespace[name], *args, **kwargs
+                )
+    return dict(sorted(cases.items()))
+
+
+def _time_sample(func: Callable, number: int) -> float:
+    gc_was_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        start = perf_counter()
+        for _ in repeat(None, number):
+            func()
+        return perf_counter() - start
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def measure(
+    func: Callable,
+    warmup: int = 1,
+    min_repeats: int = 5,
+    max_repeats: int = 200,
+    min_sample_time: float = 0.01,
+    time_budget: float = 1.0,
+) -> dict[str, float | int]:
+    """
+    Time ``func()`` over adaptive repeats and trace its peak memory.
+
+    After ``warmup`` calls, the number of calls per sample grows until a sample
+    takes at least ``min_sample_time``. Samples are then taken with the garbage
+    collector disabled until ``time_budget`` seconds are spent, but at least
+    ``min_repeats`` and at most ``max_repeats`` of them.
+
+    Returns
+    -------
+    dict[str, float | int]
+        ``median``, ``q1``, ``q3`` and ``iqr`` seconds per call, ``repeats``,
+        ``number`` of calls per sample and ``peak_bytes`` allocated
+    """
+    for _ in range(warmup):
+        func()
+    number = 1
+    while (elapsed := _time_sample(func, number)) < min_sample_time:
+        number *= 10 if elapsed < min_sample_time / 10 else 2
+    samples = [elapsed / number]
+    spent = elapsed
+    while len(samples) < max_repeats and (
+        len(samples) < min_repeats or spent < time_budget
+    ):
+        elapsed = _time_sample(func, number)
+        samples.append(elapsed / number)
+        spent += elapsed
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    func()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    if not tracing:
+        tracemalloc.stop()
+
+    q1, median, q3 = np.percentile(samples, [25, 50, 75])
+    return {
+        "median": float(median),
+        "q1": float(q1),
+        "q3": float(q3),
+        "iqr": float(q3 - q1),
+        "repeats": len(samples),
+        "number": number,
+        "peak_bytes": int(peak),
+    }
+
+
+def _same_answer(answer, expected) -> bool:
+    try:
+        return bool(answer == expected)
+    except (TypeError, ValueError):  # arrays and other non-scalar results
+        return False
+
+
+def run_benchmarks(
+    problems: Iterable[int] | None = None,
+    namespace: dict | None = None,
+    source: str | os.PathLike = __file__,
+    **options,
+) -> list[dict]:
+    """
+    Measure every discovered case of ``problems`` (by default all of them).
+
+    ``options`` are passed on to ``measure``. Answers are not reported and the
+    result cache is bypassed while timing. The first warm-up call of each case
+    is checked against the problem's registered answer (or, for an unregistered
+    problem, its first case's) and a case that answers something else is
+    skipped; a case that raises is recorded with its ``error`` instead.
+    """
+    namespace = globals() if namespace is None else namespace
+    cases = discover_benchmarks(namespace, source)
+    wanted = sorted(cases) if problems is None else problems
+    warmup = options.pop("warmup", 1)
+    results = []
+    with answer_sinks(), result_cache_disabled():
+        for problem in wanted:
+            registered = namespace["PROBLEMS"].get(problem)
+            expected = registered.expected if registered is not None else None
+            for variant, case in cases.get(problem, {}).items():
+                record = {"problem": problem, "variant": variant}
+                try:
+                    answer = case()
+                    if expected is None:
+                        expected = answer
+                    if not _same_answer(answer, expected):
+                        continue
+                    record |= measure(case, warmup=max(warmup - 1, 0), **options)
+                except Exception as error:
+                    record["error"] = repr(error)
+                results.append(record)
+    return results
+
+
+def _format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("μs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+def print_benchmarks(results: list[dict]) -> None:
+    for record in results:
+        label = f"{record['problem']:>3}  {record['variant']:<60}"
+        if "error" in record:
+            print(f"{label} {record['error']}")
+            continue
+        print(
+            f"{label} {_format_seconds(record['median']):>9} ± "
+            f"{_format_seconds(record['iqr']):<9} (IQR, {record['repeats']} runs "
+            f"× {record['number']}) {record['peak_bytes'] / 2**20:8.2f} MiB"
+        )
+
+
+def save_benchmarks(results: list[dict], path: str | os.PathLike) -> None:
+    """Write ``results`` to ``path`` as JSON, with the Python and numpy versions."""
+    document = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "time": time(),
+        "results": results,
+    }
+    Path(path).write_text(json.dumps(document, indent=2), encoding="utf-8")
+
+
+def compare_benchmarks(
+    results: list[dict], baseline: str | os.PathLike, tolerance: float = 0.1
+) -> list[dict]:
+    """
+    Cases of ``results`` that regressed against a ``save_benchmarks`` file.
+
+    A case regresses when its median is more than ``tolerance`` slower than the
+    baseline's and its inter-quartile range lies entirely above the baseline's,
+    so ordinary noise is not flagged. Cases missing from either side, or that
+    failed, are skipped.
+    """
+    document = json.loads(Path(baseline).read_text(encoding="utf-8"))
+    previous = {
+        (record["problem"], record["variant"]): record
+        for record in document["results"]
+        if "error" not in record
+    }
+    regressions = []
+    for record in results:
+        before = previous.get((record["problem"], record["variant"]))
+        if before is None or "error" in record:
+            continue
+        if (
+            record["median"] > before["median"] * (1 + tolerance)
+            and record["q1"] > before["q3"]
+        ):
+            regressions.append(
+                {
+                    "problem": record["problem"],
+                    "variant": record["variant"],
+                    "baseline": before["median"],
+                    "median": record["median"],
+                    "ratio": record["median"] / before["median"],
+                }
+            )
+    return regressions
+
+
+# %%
+# results = run_benchmarks()
+# print_benchmarks(results)
+# save_benchmarks(results, CACHE_DIR / "benchmarks.json")
+
+
+# %% [markdown]
+# ## Runner
+#
+# `python 01_50.py [problems...] [-j WORKERS] [-t TIMEOUT]` solves registered
+# problems (all by default; ranges such as `1-10` work) in separate processes
+# and checks them against their expected answers. Each problem gets its own
+# process so that one over its timeout can be killed without losing a worker.
+# Problems are started longest first, using the durations of the previous run,
+# so the whole set takes about as long as its slowest problem. `--fresh`
+# recomputes every answer instead of reading the result cache, and the run fails
+# if a cold import of this file exceeds `--import-budget` milliseconds.
+
+
+# %%
+def _run_problem(number: int, connection, fresh: bool = False) -> None:
+    """Child process body: solve ``number`` and send back ``(answer, seconds)``."""
+    try:
+        with answer_sinks(), result_cache_disabled() if fresh else nullcontext():
+            start = perf_counter()
+            answer = solve(number)
+            seconds = perf_counter() - start
+        connection.send((answer, seconds, None))
+    except BaseException as error:
+        connection.send((None, None, repr(error)))
+    finally:
+        connection.close()
+
+
+def run_problems(
+    numbers: Iterable[int] | None = None,
+    workers: int | None = None,
+    timeout: float = 60.0,
+    history: str | os.PathLike | None = CACHE_DIR / "problem_times.json",
+    fresh: bool = False,
+) -> list[dict]:
+    """
+    Solve registered problems in parallel and check their answers.
+
+    Parameters
+    ----------
+    numbers : Iterable[int] | None, optional
+        problems to run, by default every registered one
+    workers : int | None, optional
+        processes to run at once, by default the number of CPUs
+    timeout : float, optional
+        seconds after which a problem's process is killed, by default 60.0
+    history : str | os.PathLike | None, optional
+        JSON file of previous durations, read to start slow problems first and
+        updated afterwards; None disables it
+    fresh : bool, optional
+        bypass the result cache so every answer is recomputed, by default False
+
+    Returns
+    -------
+    list[dict]
+        per problem, in the order given: ``problem``, ``solver``, ``status``
+        (``ok``, ``wrong``, ``unverified``, ``error`` or ``timeout``),
+        ``answer``, ``expected`` and ``seconds``
+    """
+    numbers = sorted(PROBLEMS) if numbers is None else list(numbers)
+    workers = workers or os.cpu_count() or 1
+    durations = {}
+    if history is not None and Path(history).exists():
+        durations = json.loads(Path(history).read_text(encoding="utf-8"))
+    pending = sorted(
+        numbers, key=lambda number: durations.get(str(number), float("inf"))
+    )
+    running: dict[int, tuple[multiprocessing.Process, object, float]] = {}
+    results: dict[int, dict] = {}
+
+    def finish(number: int, status: str, answer=None, seconds=None) -> None:
+        process, reader, started = running.pop(number)
+        process.join()
+        reader.close()
+        problem = PROBLEMS[number]
+        if status == "done":
+            if problem.expected is None:
+                status = "unverified"
+            else:
+                status = "ok" if answer == problem.expected else "wrong"
+        results[number] = {
+            "problem": number,
+            "solver": repr(problem),
+            "status": status,
+            "answer": answer,
+            "expected": problem.expected,
+            "seconds": perf_counter() - started if seconds is None else seconds,
+        }
+
+    while pending or running:
+        while pending and len(running) < workers:
+            number = pending.pop()
+            reader, writer = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(
+                target=_run_problem, args=(number, writer, fresh)
+            )
+            process.start()
+            writer.close()
+            running[number] = (process, reader, perf_counter())
+
+        deadline = min(started for _, _, started in running.values()) + timeout
+        readers = {reader: number for number, (_, reader, _) in running.items()}
+        ready = multiprocessing.connection.wait(
+            list(readers), timeout=max(deadline - perf_counter(), 0)
+        )
+        for reader in ready:
+            number = readers[reader]
+            try:
+                answer, seconds, error = reader.recv()
+            except EOFError:
+                process = running[number][0]
+                process.join()
+                finish(number, "error", f"process exited with code {process.exitcode}")
+                continue
+            if error is None:
+                finish(number, "done", answer, seconds)
+            else:
+                finish(number, "error", error)
+        for number, (process, _, started) in list(running.items()):
+            if perf_counter() - started > timeout:
+                process.kill()
+                finish(number, "timeout")
+
+    if history is not None:
+        durations |= {
+            str(number): result["seconds"]
+            for number, result in results.items()
+            if result["status"] != "error"
+        }
+        Path(history).parent.mkdir(parents=True, exist_ok=True)
+        Path(history).write_text(json.dumps(durations, indent=2), encoding="utf-8")
+    return [results[number] for number in numbers]
+
+
+def print_problem_table(results: list[dict]) -> None:
+    print(f"{'#':>3}  {'solver':<50} {'answer':>16}  {'status':<10} {'time':>9}")
+    for result in results:
+        print(
+            f"{result['problem']:>3}  {result['solver'][:50]:<50} "
+            f"{str(result['answer'])[:16]:>16}  {result['status']:<10} "
+            f"{_format_seconds(result['seconds']):>9}"
+        )
+
+
+def _parse_problem_numbers(arguments: list[str]) -> list[int]:
+    numbers = []
+    for argument in arguments:
+        first, _, last = argument.partition("-")
+        try:
+            numbers.extend(range(int(first), int(last or first) + 1))
+        except ValueError:
+            raise ValueError(
+                f"{argument!r} is not a problem number or a range such as 1-10"
+            ) from None
+    return numbers
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Command line runner; exits non-zero unless every answer is ``ok`` and a cold
+    import of this file stays within ``--import-budget``.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Solve registered Project Euler problems in parallel."
+    )
+    parser.add_argument(
+        "problems",
+        nargs="*",
+        help="problem numbers or ranges such as 1-10; all by default",
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, help="processes, by default one per CPU"
+    )
+    parser.add_argument(
+        "-t", "--timeout", type=float, default=60.0, help="seconds per problem (60)"
+    )
+    parser.add_argument(
+        "--import-budget",
+        type=float,
+        default=400.0,
+        metavar="MS",
+        help="fail if a cold import of this file takes longer (400); 0 skips it",
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="recompute every answer instead of reading the result cache",
+    )
+    options = parser.parse_args(argv)
+    try:
+        numbers = _parse_problem_numbers(options.problems) or None
+    except ValueError as error:
+        parser.error(str(error))
+    unknown = set(numbers or ()) - PROBLEMS.keys()
+    if unknown:
+        parser.error(f"unregistered problems: {', '.join(map(str, sorted(unknown)))}")
+
+    import_ok = True
+    if options.import_budget:
+        try:
+            times = cold_start_import_times(options.import_budget)
+        except RuntimeError as error:
+            print(error)
+            import_ok = False
+        else:
+            print(f"cold import in {_format_seconds(times['total'] / 1000)}")
+
+    start = perf_counter()
+    results = run_problems(
+        numbers, options.workers, options.timeout, fresh=options.fresh
+    )
+    print_problem_table(results)
+    wall = perf_counter() - start
+    print(f"{len(results)} problems in {_format_seconds(wall)} wall time")
+    return 0 if import_ok and all(r["status"] == "ok" for r in results) else 1
+
+
+# %%
+if __name__ == "__main__" and "IPython" not in sys.modules:
+    raise SystemExit(main())